@@ -1,6 +1,117 @@
+"""User-uploaded market data: CSV, Parquet or Arrow IPC.
+
+Uploads are copied to a temporary file in chunks (hashed on the way, for the
+result cache) and then scanned lazily, so only the requested columns are
+ever materialized. Parquet and Arrow IPC files are read with projection
+pushdown. The format is detected from the file contents.
+
+    BACKTEST_UPLOAD_DIR   directory for spooled uploads, default the system temp dir
+"""
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Sequence, Tuple
+
 import polars as pl
-from io import StringIO
 
-def load_from_upload(file_path: StringIO) -> pl.DataFrame:
-    df = pl.read_csv(file_path)
-    return df
\ No newline at end of file
+from .schema import canonical_name, normalize, SYMBOL_COLUMN, DATE_COLUMN
+
+CHUNK_SIZE = 1 << 20
+
+def spool_upload(source: BinaryIO) -> Tuple[str, str]:
+    """Copy an upload stream to a temporary file; returns (path, sha256 hex digest).
+
+    The caller owns the file and removes it when done.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=os.environ.get("BACKTEST_UPLOAD_DIR"))
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while chunk := source.read(CHUNK_SIZE):
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+def remove_upload(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def upload_format(path: str) -> str:
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    if magic[:4] == b"PAR1":
+        return "parquet"
+    if magic == b"ARROW1":
+        return "ipc"
+    if magic[:4] == b"\xff\xff\xff\xff":
+        return "ipc_stream"
+    return "csv"
+
+def scan_upload(path: str) -> pl.LazyFrame:
+    fmt = upload_format(path)
+    if fmt == "parquet":
+        return pl.scan_parquet(path)
+    if fmt == "ipc":
+        # Uncompressed IPC files are memory-mapped by the scan
+        return pl.scan_ipc(path)
+    if fmt == "ipc_stream":
+        # The stream format has no footer to scan; it is read eagerly
+        return pl.read_ipc_stream(path).lazy()
+    return pl.scan_csv(path, try_parse_dates=True, infer_schema_length=10000)
+
+def load_from_upload(path: str, columns: Optional[Sequence[str]] = None,
+                     optional: Sequence[str] = ()) -> pl.DataFrame:
+    """Uploaded rows in the canonical layout, ordered by symbol and date like DB loads.
+
+    columns limits the load to those columns; None keeps every column.
+    Columns also named in optional (canonical names) are loaded only if the
+    upload has them.
+    """
+    frame = scan_upload(path)
+    if columns is not None and optional:
+        present = {canonical_name(name) for name in frame.collect_schema().names()}
+        columns = [c for c in columns if canonical_name(c) in present or canonical_name(c) not in optional]
+    frame = normalize(frame, columns)
+    names = frame.collect_schema().names()
+    order = [c for c in (SYMBOL_COLUMN, DATE_COLUMN) if c in names]
+    if order:
+        frame = frame.sort(order, maintain_order=True)
+    try:
+        df = frame.collect()
+    except pl.exceptions.PolarsError as e:
+        raise ValueError(f"Could not read upload: {e}") from e
+    if df.is_empty():
+        raise ValueError("Uploaded file has no rows")
+    return df
+
+def iter_upload(path: str, columns: Optional[Sequence[str]] = None,
+                batch_rows: int = 1_000_000) -> Iterator[pl.DataFrame]:
+    """Uploaded rows in file order, as canonical frames of at most batch_rows.
+
+    Only one batch is in memory at a time; unlike load_from_upload() the
+    rows are not sorted. CSV uploads are first converted, streaming, to a
+    Parquet file holding just the requested columns, which is then read a
+    slice at a time (a streaming collect reads ahead of a slow consumer).
+    """
+    converted = None
+    try:
+        frame = normalize(scan_upload(path), columns)
+        if upload_format(path) == "csv":
+            converted = f"{path}.parquet"
+            frame.sink_parquet(converted)
+            frame = pl.scan_parquet(converted)
+        total = frame.select(pl.len()).collect().item()
+        if not total:
+            raise ValueError("Uploaded file has no rows")
+        for offset in range(0, total, batch_rows):
+            yield frame.slice(offset, batch_rows).collect()
+    except pl.exceptions.PolarsError as e:
+        raise ValueError(f"Could not read upload: {e}") from e
+    finally:
+        if converted:
+            remove_upload(converted)
@@ -0,0 +1,174 @@
+"""Indicator columns persisted on disk and shared by every backtest.
+
+Enabled by pointing BACKTEST_INDICATOR_STORE at a directory, typically next
+to the database and BACKTEST_PARQUET_CACHE; unset disables the store.
+
+An entry holds one indicator of one symbol, keyed by symbol, column name
+(which encodes the parameters, e.g. "sma_50") and the series' first bar:
+
+    <root>/<SYMBOL>/<indicator>/<first bar>/manifest.json
+    <root>/<SYMBOL>/<indicator>/<first bar>/<from>-<to>.arrow
+
+Parts are uncompressed Arrow IPC files, which Polars memory maps, so
+reading an entry back costs less than recomputing even a moving average;
+Parquet's decoding would not. Each part holds the date, close and indicator value of a run of bars; the
+manifest lists the parts and the indicator's running state after the last
+one. The stored dates and closes are the entry's data version. A load whose
+leading bars match them exactly is served from the entry:
+
+- no more bars than stored: the values are read back
+- a few more bars (new data arrived): only the new bars are computed,
+  continuing from the stored state, and appended as a part
+- many more bars: the entry is rebuilt, as computing bar by bar from the
+  state is slower than recomputing the whole series at once
+- any stored date or close differs (a correction, a backfill, a new
+  database): the entry is rebuilt from scratch
+
+Extended values equal a full recomputation bit for bit (see strategies.base.Indicator).
+"""
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+import polars as pl
+
+from telemetry import count
+from .schema import DATE_COLUMN, SYMBOL_COLUMN
+
+FORMAT_VERSION = 3
+# Parts beyond this are merged into one file on the next extension
+MAX_PARTS = 32
+# Extensions step through new bars in Python, about a microsecond each, where
+# a rebuild costs a few hundredths of that per bar; longer tails are rebuilt
+MAX_EXTENSION = 256
+
+
+def _write_atomic(path: str, write):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class IndicatorStore:
+    """Indicator entries under root; see the module docstring for the layout."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def entry_dir(self, symbol: str, name: str, first) -> str:
+        # ISO dates and datetimes without the characters paths dislike
+        first = str(first).replace(" ", "T").replace(":", "")
+        return os.path.join(self.root, symbol.upper(), name, first)
+
+    def _manifest(self, entry: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(entry, "manifest.json")) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("format") == FORMAT_VERSION else None
+
+    def _read(self, entry: str, manifest: dict, rows: int) -> Optional[pl.DataFrame]:
+        files = [os.path.join(entry, part) for part in manifest["parts"]]
+        try:
+            return pl.scan_ipc(files).head(rows).collect()
+        except (OSError, pl.exceptions.PolarsError):
+            # A concurrent rebuild replaced the parts; treat as a miss
+            return None
+
+    def _write(self, entry: str, frame: pl.DataFrame, start: int, manifest: dict):
+        os.makedirs(entry, exist_ok=True)
+        part = f"{start}-{start + frame.height}.arrow"
+        _write_atomic(os.path.join(entry, part), frame.write_ipc)
+        manifest = dict(manifest, parts=[*manifest.get("parts", []), part])
+
+        def write_manifest(path):
+            with open(path, "w") as f:
+                json.dump(manifest, f)
+        _write_atomic(os.path.join(entry, "manifest.json"), write_manifest)
+        # Parts left over from an earlier version of the entry
+        for name in os.listdir(entry):
+            if name.endswith(".arrow") and name not in manifest["parts"]:
+                try:
+                    os.remove(os.path.join(entry, name))
+                except OSError:
+                    pass
+
+    def values(self, symbol: str, name: str, indicator, data: pl.DataFrame) -> pl.Series:
+        """The indicator over data (one symbol's bars, in date order), from the store where possible."""
+        keys = data.select(DATE_COLUMN, "close")
+        entry = self.entry_dir(symbol, name, keys.item(0, DATE_COLUMN))
+        manifest = self._manifest(entry)
+        stored = None
+        if manifest is not None:
+            stored = self._read(entry, manifest, keys.height)
+        if stored is not None and stored.select(DATE_COLUMN, "close").equals(keys.head(stored.height)):
+            if stored.height == keys.height:
+                count("indicator_store_hits")
+                return stored.get_column(name)
+            tail = keys.slice(stored.height)
+            if stored.height == manifest["rows"] and tail.height <= min(stored.height, MAX_EXTENSION):
+                count("indicator_store_extensions")
+                state = manifest["state"]
+                new = tail.with_columns(indicator.extend(state, tail.get_column("close")).alias(name))
+                if len(manifest["parts"]) >= MAX_PARTS:
+                    self._rewrite(entry, pl.concat([stored, new]), state)
+                else:
+                    self._write(entry, new, stored.height,
+                                dict(manifest, rows=keys.height, state=state))
+                return pl.concat([stored.get_column(name), new.get_column(name)])
+
+        # Missing, unreadable, computed from different prices or far behind
+        count("indicator_store_builds")
+        values, state = indicator.build(keys.get_column("close"))
+        frame = keys.with_columns(values.cast(pl.Float64).alias(name))
+        self._rewrite(entry, frame, state)
+        return frame.get_column(name)
+
+    def _rewrite(self, entry: str, frame: pl.DataFrame, state: dict):
+        manifest = {"format": FORMAT_VERSION, "rows": frame.height, "state": state, "parts": []}
+        self._write(entry, frame, 0, manifest)
+
+    def clear(self, symbol: Optional[str] = None):
+        """Drop every entry, or those of one symbol."""
+        path = self.root if symbol is None else os.path.join(self.root, symbol.upper())
+        shutil.rmtree(path, ignore_errors=True)
+
+
+_store = None
+
+def get_indicator_store() -> Optional[IndicatorStore]:
+    global _store
+    root = os.environ.get("BACKTEST_INDICATOR_STORE")
+    if not root:
+        return None
+    if _store is None or _store.root != root:
+        _store = IndicatorStore(root)
+    return _store
+
+def load_indicators(data: pl.DataFrame, indicators: Dict, symbol: Optional[str] = None,
+                    store: Optional[IndicatorStore] = None) -> Optional[pl.DataFrame]:
+    """Stored indicator columns, row for row with data, or None without a store.
+
+    data holds stock DB rows ordered by date: one symbol's, named by symbol,
+    or several, ordered by symbol and date, with a Symbol column.
+    indicators maps column names to Indicators (Strategy.indicators()).
+    store defaults to the one BACKTEST_INDICATOR_STORE configures.
+    """
+    store = store or get_indicator_store()
+    if store is None or not indicators or data.is_empty() or DATE_COLUMN not in data.columns:
+        return None
+    if symbol is not None:
+        groups = {symbol: data}
+    elif SYMBOL_COLUMN in data.columns:
+        groups = {key[0]: group for key, group in
+                  data.partition_by(SYMBOL_COLUMN, maintain_order=True, as_dict=True).items()}
+    else:
+        return None
+    return pl.concat([
+        pl.DataFrame([store.values(sym, name, indicator, group).alias(name)
+                      for name, indicator in indicators.items()])
+        for sym, group in groups.items()
+    ])
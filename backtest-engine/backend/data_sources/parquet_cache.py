@@ -0,0 +1,62 @@
+import hashlib
+import os
+import shutil
+import threading
+from datetime import date
+from typing import List, Sequence
+
+import polars as pl
+
+class PartitionCache:
+    """Local Parquet copy of market data, one file per symbol and year.
+
+    Laid out as <root>/<version>/<SYMBOL>/<year>.parquet with every table
+    column, so any column projection can be served from it. Only years
+    before the current one are cached; those rows rarely change, and when
+    the database does, its version (stock_db.ConnectionPool.version()) does
+    too, so the partitions are read again. Symbols are expected in the
+    upper case the database query uses.
+    """
+
+    def __init__(self, root: str, version: str = ""):
+        self.root = root
+        self.version = version
+        self.dir = os.path.join(root, hashlib.sha256(version.encode()).hexdigest()[:16])
+
+    def path(self, symbol: str, year: int) -> str:
+        return os.path.join(self.dir, symbol, f"{year}.parquet")
+
+    def prune(self):
+        """Remove partitions cached for other database versions."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.root, name)
+            if path != self.dir and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def cacheable(year: int) -> bool:
+        return year < date.today().year
+
+    def missing(self, symbols: Sequence[str], years: Sequence[int]) -> List[tuple]:
+        return [
+            (symbol, year) for symbol in symbols for year in years
+            if self.cacheable(year) and not os.path.exists(self.path(symbol, year))
+        ]
+
+    def files(self, symbols: Sequence[str], years: Sequence[int]) -> List[str]:
+        return [
+            self.path(symbol, year) for symbol in symbols for year in years
+            if self.cacheable(year) and os.path.exists(self.path(symbol, year))
+        ]
+
+    def write(self, symbol: str, year: int, df: pl.DataFrame):
+        # Empty partitions are written too, so gaps are not re-queried
+        path = self.path(symbol, year)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.write_parquet(tmp)
+        os.replace(tmp, path)
@@ -0,0 +1,64 @@
+"""Canonical column layout shared by every market data source.
+
+Column names are matched case-insensitively, plus a few common aliases, and
+renamed to their canonical spelling ("Date" -> "date", "Close" -> "close",
+"ticker" -> "Symbol"). Prices and volume are cast to Float64 and string dates
+are parsed, so the engine sees the same typed frame whatever the source.
+Columns outside the layout keep their names and types.
+"""
+from typing import Optional, Sequence
+
+import polars as pl
+
+SYMBOL_COLUMN = "Symbol"
+DATE_COLUMN = "date"
+
+CANONICAL_DTYPES = {
+    "open": pl.Float64,
+    "high": pl.Float64,
+    "low": pl.Float64,
+    "close": pl.Float64,
+    "volume": pl.Float64,
+    SYMBOL_COLUMN: pl.String,
+}
+_CANONICAL_NAMES = {name.lower(): name for name in [DATE_COLUMN, *CANONICAL_DTYPES]}
+_ALIASES = {"timestamp": DATE_COLUMN, "datetime": DATE_COLUMN, "time": DATE_COLUMN, "ticker": SYMBOL_COLUMN}
+
+def canonical_name(name: str) -> str:
+    key = name.strip().lower()
+    return _CANONICAL_NAMES.get(_ALIASES.get(key, key), name)
+
+def normalize(frame: pl.LazyFrame, columns: Optional[Sequence[str]] = None) -> pl.LazyFrame:
+    """Rename and cast frame to the canonical layout, keeping only columns if given.
+
+    Raises ValueError for missing or ambiguous columns and for values that
+    cannot take the canonical type.
+    """
+    names = frame.collect_schema().names()
+    renames = {}
+    for name in names:
+        canonical = canonical_name(name)
+        if canonical in renames.values() or (canonical != name and canonical in names):
+            raise ValueError(f"More than one column maps to {canonical!r}")
+        renames[name] = canonical
+    frame = frame.rename(renames)
+
+    if columns is not None:
+        wanted = list(dict.fromkeys(canonical_name(c) for c in columns))
+        missing = [c for c in wanted if c not in renames.values()]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        frame = frame.select(wanted)
+
+    casts = []
+    for name, dtype in frame.collect_schema().items():
+        if name == DATE_COLUMN:
+            if dtype == pl.String:
+                casts.append(pl.col(name).str.to_datetime(strict=True))
+            elif not dtype.is_temporal():
+                raise ValueError(f"{name} column must hold dates, got {dtype}")
+        elif name in CANONICAL_DTYPES and dtype != CANONICAL_DTYPES[name]:
+            if name != SYMBOL_COLUMN and not dtype.is_numeric():
+                raise ValueError(f"{name} column must be numeric, got {dtype}")
+            casts.append(pl.col(name).cast(CANONICAL_DTYPES[name]))
+    return frame.with_columns(casts) if casts else frame
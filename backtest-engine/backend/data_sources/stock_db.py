@@ -1,19 +1,241 @@
-import pandas as pd
-import polars as pl
+"""DuckDB market data source.
+
+Configured from the environment:
+
+    BACKTEST_DB_PATH          DuckDB database file (required)
+    BACKTEST_DB_TABLE         OHLCV table, default nuclear_stocks.nuclear_stocks_table
+    BACKTEST_DB_CONNECTIONS   concurrent queries allowed, default 4
+    BACKTEST_DB_TIMEOUT       seconds to wait for a free slot, default 30
+    BACKTEST_PARQUET_CACHE    directory for the symbol/year Parquet cache, kept per database version;
+                              unset disables it
+
+One read-only connection is opened per process and every load runs on its
+own cursor. Loads beyond BACKTEST_DB_CONNECTIONS queue for a slot instead
+of piling onto the database, and fail after BACKTEST_DB_TIMEOUT.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
 import duckdb
-from fastapi import HTTPException
+import polars as pl
+
+from telemetry import count
+from .parquet_cache import PartitionCache
+from .schema import normalize
+
+DEFAULT_TABLE = "nuclear_stocks.nuclear_stocks_table"
+SYMBOL_COLUMN = "Symbol"
+DATE_COLUMN = "Date"
+
+class DataNotFoundError(LookupError):
+    """No rows for the requested symbols and date range."""
+
+
+class ConnectionPool:
+    """Shared read-only DuckDB connection handing out one cursor per load."""
+
+    def __init__(self, path: str, table: str = DEFAULT_TABLE, max_connections: int = 4,
+                 timeout: float = 30.0):
+        self.path = path
+        self.table = table
+        self.timeout = timeout
+        self._connection = duckdb.connect(path, read_only=True)
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._columns = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def cursor(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection free after {self.timeout}s")
+        try:
+            with self._lock:
+                cursor = self._connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+        finally:
+            self._slots.release()
+
+    def columns(self) -> Dict[str, str]:
+        """Table columns keyed by lower-cased name."""
+        if self._columns is None:
+            with self.cursor() as cur:
+                rows = cur.execute(f"DESCRIBE {self.table}").fetchall()
+            self._columns = {row[0].lower(): row[0] for row in rows}
+        return self._columns
+
+    def projection(self, columns: Optional[Sequence[str]]) -> str:
+        """SELECT list for the requested columns, named as requested."""
+        # Looked up before any cursor is taken, so a load never holds two slots
+        table_columns = self.columns()
+        if columns is None:
+            return "*"
+        unknown = [c for c in columns if c.lower() not in table_columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+        return ", ".join(f'"{table_columns[c.lower()]}" AS "{c}"' for c in columns)
+
+    def version(self) -> str:
+        """Changes whenever the database is written to.
+
+        DuckDB appends commits to <path>.wal until a checkpoint folds them
+        into the main file, so the WAL's mtime and size count too.
+        """
+        stat = os.stat(self.path)
+        try:
+            wal = os.stat(f"{self.path}.wal")
+            wal_version = f"{wal.st_mtime_ns}.{wal.st_size}"
+        except FileNotFoundError:
+            wal_version = "-"
+        return f"{os.path.abspath(self.path)}:{stat.st_mtime_ns}:{wal_version}:{self.table}"
+
+    def close(self):
+        self._connection.close()
 
-def load_from_stock_db(symbol: str, start_date: str, end_date: str) -> pl.DataFrame:
-    con = duckdb.connect("E:/python coding/projects/asset-management-dashboard/nuclear_stocks.duckdb")
 
-    # Query market data from DuckDB using Polars
-    query = """
-    SELECT * FROM nuclear_stocks.nuclear_stocks_table
-    WHERE Symbol = ? AND Date >= ? AND Date <= ?
-    ORDER BY Date
+_pool = None
+_cache = None
+_config_lock = threading.Lock()
+
+def build_pool_from_env() -> ConnectionPool:
+    path = os.environ.get("BACKTEST_DB_PATH")
+    if not path:
+        raise RuntimeError("BACKTEST_DB_PATH is not set")
+    return ConnectionPool(
+        path,
+        table=os.environ.get("BACKTEST_DB_TABLE", DEFAULT_TABLE),
+        max_connections=int(os.environ.get("BACKTEST_DB_CONNECTIONS", 4)),
+        timeout=float(os.environ.get("BACKTEST_DB_TIMEOUT", 30))
+    )
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _config_lock:
+            if _pool is None:
+                _pool = build_pool_from_env()
+    return _pool
+
+def get_partition_cache() -> Optional[PartitionCache]:
+    global _cache
+    root = os.environ.get("BACKTEST_PARQUET_CACHE")
+    if not root:
+        return None
+    version = data_version()
+    if _cache is None or _cache.root != root or _cache.version != version:
+        _cache = PartitionCache(root, version)
+        # Partitions of an earlier database version are never read again
+        _cache.prune()
+    return _cache
+
+def configure(pool: Optional[ConnectionPool] = None, cache: Optional[PartitionCache] = None):
+    """Replace the env-configured pool and cache (tests, scripts)."""
+    global _pool, _cache
+    _pool, _cache = pool, cache
+
+def data_version() -> str:
+    return get_pool().version()
+
+def _placeholders(values) -> str:
+    return ", ".join("?" for _ in values)
+
+def _fill_cache(cur, pool: ConnectionPool, cache: PartitionCache, missing: List[tuple]):
+    symbols = sorted({symbol for symbol, _ in missing})
+    years = sorted({year for _, year in missing})
+    query = f"""
+    SELECT * FROM {pool.table}
+    WHERE {SYMBOL_COLUMN} IN ({_placeholders(symbols)}) AND {DATE_COLUMN} >= ? AND {DATE_COLUMN} < ?
+    """
+    params = [*symbols, date(years[0], 1, 1), date(years[-1] + 1, 1, 1)]
+    df = cur.execute(query, params).pl()
+    count("duckdb_queries")
+    symbol_column = pool.columns()[SYMBOL_COLUMN.lower()]
+    date_column = pool.columns()[DATE_COLUMN.lower()]
+    year = pl.col(date_column).dt.year()
+    for symbol, y in missing:
+        cache.write(symbol, y, df.filter((pl.col(symbol_column) == symbol) & (year == y)))
+
+def _select_query(cur, pool: ConnectionPool, symbols: List[str], start_date: str, end_date: str,
+                  select: str) -> Tuple[str, list]:
+    """(query, params) selecting rows for symbols and dates, ordered by symbol and date."""
+    cache = get_partition_cache()
+    filters = f"{SYMBOL_COLUMN} IN ({_placeholders(symbols)}) AND {DATE_COLUMN} >= ? AND {DATE_COLUMN} <= ?"
+    params = [*symbols, start_date, end_date]
+    order = f"ORDER BY {SYMBOL_COLUMN}, {DATE_COLUMN}"
+    if cache is None:
+        return f"SELECT {select} FROM {pool.table} WHERE {filters} {order}", params
+
+    years = range(int(start_date[:4]), int(end_date[:4]) + 1)
+    missing = cache.missing(symbols, years)
+    count("partition_cache_hits", len(symbols) * sum(map(cache.cacheable, years)) - len(missing))
+    count("partition_cache_misses", len(missing))
+    if missing:
+        _fill_cache(cur, pool, cache, missing)
+    # Closed years come from Parquet, the current year from the database
+    sources = [f"SELECT * FROM {pool.table} WHERE {DATE_COLUMN} >= ?"]
+    source_params = [date(date.today().year, 1, 1)]
+    files = cache.files(symbols, years)
+    if files:
+        sources.append(f"SELECT * FROM read_parquet([{_placeholders(files)}])")
+        source_params += files
+    query = f"""
+    SELECT {select} FROM ({" UNION ALL BY NAME ".join(sources)})
+    WHERE {filters} {order}
+    """
+    return query, source_params + params
+
+def _symbols_and_columns(symbol, columns):
+    # Upper case, as stored, so the query and the partition cache agree
+    symbols = [s.upper() for s in ([symbol] if isinstance(symbol, str) else symbol)]
+    if not symbols:
+        raise ValueError("At least one symbol is required")
+    if columns is not None and len(symbols) > 1 and SYMBOL_COLUMN.lower() not in {c.lower() for c in columns}:
+        columns = [SYMBOL_COLUMN, *columns]
+    return symbols, columns
+
+def load_from_stock_db(symbol: Union[str, Sequence[str]], start_date: str, end_date: str,
+                       columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+    """Rows for one symbol, or several (Symbol column first), ordered by symbol and date.
+
+    columns limits the query to those columns (matched case-insensitively);
+    None selects every column. Either way the frame comes back in the
+    canonical layout of data_sources.schema.
     """
-    df = pl.from_arrow(con.execute(query, (symbol, start_date, end_date)).arrow())
-    
+    symbols, columns = _symbols_and_columns(symbol, columns)
+    pool = get_pool()
+    select = pool.projection(columns)
+    with pool.cursor() as cur:
+        query, params = _select_query(cur, pool, symbols, start_date, end_date, select)
+        df = cur.execute(query, params).pl()
+        count("duckdb_queries")
+
     if df.is_empty():
-        raise HTTPException(status_code=404, detail="No data found for the given symbol and date range")
-    return df
\ No newline at end of file
+        raise DataNotFoundError("No data found for the given symbol and date range")
+    return normalize(df.lazy()).collect()
+
+def iter_stock_db(symbol: Union[str, Sequence[str]], start_date: str, end_date: str,
+                  columns: Optional[Sequence[str]] = None, batch_rows: int = 1_000_000) -> Iterator[pl.DataFrame]:
+    """The rows load_from_stock_db() would return, as frames of at most batch_rows.
+
+    The query streams from DuckDB, so only one batch is in memory at a time;
+    the load holds its connection slot until the iterator is exhausted or closed.
+    """
+    symbols, columns = _symbols_and_columns(symbol, columns)
+    pool = get_pool()
+    select = pool.projection(columns)
+    with pool.cursor() as cur:
+        query, params = _select_query(cur, pool, symbols, start_date, end_date, select)
+        reader = cur.execute(query, params).fetch_record_batch(batch_rows)
+        count("duckdb_queries")
+        empty = True
+        for batch in reader:
+            if batch.num_rows:
+                empty = False
+                yield normalize(pl.from_arrow(batch).lazy()).collect()
+    if empty:
+        raise DataNotFoundError("No data found for the given symbol and date range")
@@ -1,5 +1,10 @@
+from typing import Dict, Optional
+
 import polars as pl
 
+# Columns simple_market_fill reads from the signals frame, besides "signals"
+REQUIRED_COLUMNS = ["date", "close"]
+
 def simple_market_fill(df: pl.DataFrame, initial_capital=10000, return_trades=False):
     df = df.with_columns([
         (pl.col("close").pct_change().fill_null(0)).alias("returns"),
@@ -45,3 +50,83 @@ def simple_market_fill(df: pl.DataFrame, initial_capital=10000, return_trades=Fa
     else:
         return equity_dict, returns_dict
 
+
+EXECUTION_MODES = ("long_short", "long_only")
+
+def columnar_fill(df: pl.DataFrame, initial_capital=10000, commission=0.0, slippage=0.0,
+                  position_size=1.0, mode="long_short", by: Optional[str] = None,
+                  state: Optional[Dict[str, float]] = None):
+    """Market-on-close fills computed entirely as Polars expressions.
+
+    Each bar's signal sets the target exposure, signal * position_size of
+    equity (short signals become flat in long_only mode), filled at that
+    bar's close and held from the next bar. Every change of exposure costs
+    commission + slippage per unit of equity traded, charged on the fill bar.
+
+    Returns (bars, trades): bars gains returns, target, position, turnover,
+    costs, strategy_returns and equity_curve columns; trades has one row per
+    exposure change with the slippage-adjusted fill price. With no costs, full
+    size and long_short mode the equity curve equals simple_market_fill's.
+
+    With by (e.g. "Symbol"), df holds several series sorted by that column
+    and date; every one is filled independently, each with initial_capital.
+
+    With state, df continues a single series filled earlier: state holds the
+    "close" and "target" of the bar before df and the equity "growth" (equity
+    over initial_capital) after it. fill_state() gives the state after df.
+    """
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"mode must be one of {', '.join(EXECUTION_MODES)}")
+    if position_size <= 0:
+        raise ValueError("position_size must be positive")
+    if commission < 0 or slippage < 0:
+        raise ValueError("commission and slippage must not be negative")
+    if state is not None and by:
+        raise ValueError("Continuing from state is only supported for a single series")
+
+    def window(expr: pl.Expr) -> pl.Expr:
+        # Order-dependent expressions restart for every series
+        return expr.over(by) if by else expr
+
+    # Carried over from the previous piece of the series, or a fresh start
+    first_return = pl.lit(None) if state is None else (pl.col("close") - state["close"]) / state["close"]
+    prev_target = 0 if state is None else state["target"]
+    growth = 1.0 if state is None else state["growth"]
+
+    lower = 0 if mode == "long_only" else -1
+    timestamp = pl.col("date") if "date" in df.columns else window(pl.int_range(pl.len()))
+    bars = df.with_columns([
+        timestamp.alias("timestamp"),
+        window(pl.col("close").pct_change()).fill_null(first_return).fill_null(0).alias("returns"),
+        (pl.col("signals").clip(lower, 1).cast(pl.Float64) * position_size).alias("target"),
+    ]).with_columns([
+        window(pl.col("target").shift(1)).fill_null(prev_target).alias("position"),
+    ]).with_columns([
+        (pl.col("target") - pl.col("position")).alias("trade_size"),
+    ]).with_columns([
+        pl.col("trade_size").abs().alias("turnover"),
+        (pl.col("trade_size").abs() * (commission + slippage)).alias("costs"),
+    ]).with_columns([
+        (pl.col("position") * pl.col("returns") - pl.col("costs")).alias("strategy_returns"),
+    ]).with_columns([
+        (window((pl.col("strategy_returns") + 1).cum_prod()) * growth * initial_capital).alias("equity_curve"),
+    ])
+
+    direction = pl.col("trade_size").sign()
+    trades = bars.with_columns([
+        (pl.col("costs") * window(pl.col("equity_curve").shift(1)).fill_null(growth * initial_capital)).alias("cost"),
+    ]).filter(pl.col("trade_size") != 0).select([
+        *([pl.col(by)] if by else []),
+        pl.col("timestamp"),
+        pl.when(direction > 0).then(pl.lit("buy")).otherwise(pl.lit("sell")).alias("action"),
+        (pl.col("close") * (1 + direction * slippage)).alias("price"),
+        pl.col("trade_size").abs().alias("size"),
+        pl.col("target").alias("exposure"),
+        pl.col("cost"),
+    ])
+    return bars.drop("trade_size"), trades
+
+def fill_state(bars: pl.DataFrame, initial_capital) -> Dict[str, float]:
+    """State for continuing a single series after the filled bars (see columnar_fill)."""
+    last = bars.select("close", "target", "equity_curve").row(-1, named=True)
+    return {"close": last["close"], "target": last["target"], "growth": last["equity_curve"] / initial_capital}
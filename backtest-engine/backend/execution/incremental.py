@@ -0,0 +1,71 @@
+import copy
+from typing import Any, Dict
+
+import polars as pl
+
+from strategies.strategy_factor import StrategyFactory
+
+class IncrementalBacktest:
+    """Bar-by-bar counterpart of generate_signals() + simple_market_fill().
+
+    Keeps the strategy's indicator state plus the last close, the position
+    held into the next bar and the running equity growth, so appending N bars
+    costs O(N) however long the history is. The rows append() returns match
+    simple_market_fill's frame for the same bars run over the full history.
+    """
+
+    def __init__(self, strategy_config: Dict[str, Any], initial_capital: float = 10000):
+        self.strategy_config = dict(strategy_config)
+        self.initial_capital = initial_capital
+        self.strategy = StrategyFactory.create_strategy(self.strategy_config)
+        self.strategy.validate()
+        self.state = {
+            "strategy": self.strategy.initial_state(),
+            "prev_close": None,
+            "position": 0,
+            "growth": 1.0,
+            "bars": 0,
+        }
+
+    def append(self, bars: pl.DataFrame) -> pl.DataFrame:
+        """Run the strategy and fills over bars that follow everything seen so far."""
+        df = self.strategy.update_signals(self.state["strategy"], bars)
+        state = self.state
+        returns, shifted, strategy_returns, equity = [], [], [], []
+        for close, signal in zip(df.get_column("close"), df.get_column("signals")):
+            close = float(close)
+            prev_close = state["prev_close"]
+            ret = 0.0 if prev_close is None else (close - prev_close) / prev_close
+            strategy_return = state["position"] * ret
+            state["growth"] *= strategy_return + 1
+            returns.append(ret)
+            shifted.append(state["position"])
+            strategy_returns.append(strategy_return)
+            equity.append(state["growth"] * self.initial_capital)
+            state["prev_close"], state["position"] = close, signal
+            state["bars"] += 1
+
+        return df.with_columns([
+            pl.Series("returns", returns, dtype=pl.Float64),
+            pl.Series("shifted_signals", shifted, dtype=pl.Int8),
+            pl.Series("strategy_returns", strategy_returns, dtype=pl.Float64),
+            pl.Series("equity_curve", equity, dtype=pl.Float64),
+        ])
+
+    @property
+    def equity(self) -> float:
+        return self.state["growth"] * self.initial_capital
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything needed to resume; plain values only, safe to store as JSON."""
+        return {
+            "strategy_config": copy.deepcopy(self.strategy_config),
+            "initial_capital": self.initial_capital,
+            "state": copy.deepcopy(self.state),
+        }
+
+    @classmethod
+    def restore(cls, snapshot: Dict[str, Any]) -> "IncrementalBacktest":
+        backtest = cls(snapshot["strategy_config"], snapshot["initial_capital"])
+        backtest.state = copy.deepcopy(snapshot["state"])
+        return backtest
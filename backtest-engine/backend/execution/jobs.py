@@ -0,0 +1,288 @@
+"""Backtests as jobs on a process pool, with results cached by content hash.
+
+A job's id is the hash of everything its result depends on: the identity of
+the input data (a digest of the upload, or the database version) and the
+request parameters. Submitting the same backtest again returns the existing
+job, finished or still running, so repeated requests cost nothing.
+
+Configured from the environment:
+
+    BACKTEST_WORKERS        processes running backtests, default the CPU count
+    BACKTEST_RESULT_CACHE   finished jobs kept for retrieval, default 256
+    BACKTEST_STREAM_DIR     where streaming backtests write their Parquet output,
+                            default backtest-streams in the system temp dir;
+                            a job's output is removed when the job fails, is
+                            cancelled or is evicted from the result cache
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import polars as pl
+
+from strategies.strategy_factor import StrategyFactory
+from data_sources.stock_db import load_from_stock_db, iter_stock_db
+from data_sources.custom_upload import load_from_upload, iter_upload
+from data_sources.indicator_store import load_indicators
+from data_sources.schema import DATE_COLUMN
+from execution.engine import columnar_fill, REQUIRED_COLUMNS
+from execution.metrics import compute_metrics, rolling_metrics
+from execution.streaming import run_streaming_backtest
+from telemetry import profiling, stage, rows, observe, JOBS
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+def job_key(data_identity: Dict[str, Any], params: Dict[str, Any]) -> str:
+    payload = json.dumps({"data": data_identity, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def run_backtest(params: Dict[str, Any], upload_path: Optional[str] = None) -> Dict[str, Any]:
+    """One backtest from BacktestRequest fields, on a spooled upload or stock DB rows.
+
+    Runs in a worker process, so data is loaded there rather than shipped
+    over from the API process. The result carries the run's profile (see
+    telemetry) for the API process to record.
+    """
+    with profiling() as profile:
+        strategy = StrategyFactory.create_strategy(params["strategy"])
+        # Load only the columns the strategy and engine read
+        columns = list(dict.fromkeys(REQUIRED_COLUMNS + strategy.required_columns()))
+        with stage("load"):
+            if upload_path is not None:
+                # Uploads may leave out dates; bars are then numbered (see columnar_fill)
+                data = load_from_upload(upload_path, columns, optional=[DATE_COLUMN])
+            else:
+                data = load_from_stock_db(params["symbol"], params["start_date"], params["end_date"], columns=columns)
+        rows("input", data.height)
+
+        indicators = None
+        if upload_path is None:
+            # Indicators already computed for this symbol are read, not recomputed
+            with stage("indicators"):
+                indicators = load_indicators(data, strategy.indicators(), params["symbol"])
+        with stage("signals"):
+            signals = strategy.generate_signals(data, indicators)
+        with stage("fill"):
+            bars, trades = columnar_fill(
+                signals,
+                initial_capital=params["initial_capital"],
+                commission=params["commission"],
+                slippage=params["slippage"],
+                position_size=params["position_size"],
+                mode=params["mode"]
+            )
+        rows("trades", trades.height)
+        with stage("metrics"):
+            metrics = compute_metrics(bars, params["initial_capital"])
+            metrics["trades"] = trades.height
+            rolling = None
+            if params.get("rolling_window"):
+                rolling = rolling_metrics(bars, params["rolling_window"])
+
+    # Frames, not rows: results are shaped per request (see execution.results)
+    return {
+        "metrics": metrics,
+        "equity_curve": bars.select(pl.col("timestamp"), pl.col("equity_curve").alias("equity")),
+        "trades": trades,
+        "rolling_metrics": rolling,
+        "profile": profile.to_dict(),
+    }
+
+def stream_output_dir(key: str) -> str:
+    root = os.environ.get("BACKTEST_STREAM_DIR") or os.path.join(tempfile.gettempdir(), "backtest-streams")
+    return os.path.join(root, key)
+
+def remove_stream_output(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+def run_streaming_job(params: Dict[str, Any], upload_path: Optional[str] = None) -> Dict[str, Any]:
+    """Out-of-core counterpart of run_backtest(); bars and trades go to params["output_dir"]."""
+    with profiling() as profile:
+        strategy = StrategyFactory.create_strategy(params["strategy"])
+        columns = list(dict.fromkeys(REQUIRED_COLUMNS + strategy.required_columns()))
+        if upload_path is not None:
+            batches = iter_upload(upload_path, columns, params["batch_rows"])
+        else:
+            batches = iter_stock_db(params["symbol"], params["start_date"], params["end_date"],
+                                    columns=columns, batch_rows=params["batch_rows"])
+        result = run_streaming_backtest(
+            batches,
+            strategy,
+            params["output_dir"],
+            params["initial_capital"],
+            commission=params["commission"],
+            slippage=params["slippage"],
+            position_size=params["position_size"],
+            mode=params["mode"]
+        )
+    result["profile"] = profile.to_dict()
+    return result
+
+
+class Job:
+    """A submitted backtest; its status is read off the pool future."""
+
+    def __init__(self, job_id: str, future: Future, discard: Optional[Callable[[], None]] = None):
+        self.id = job_id
+        self.future = future
+        self.submitted_at = time.time()
+        self._cancelled = False
+        self._discard = discard
+
+    @property
+    def status(self) -> str:
+        if self._cancelled or self.future.cancelled():
+            return "cancelled"
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        return "failed" if self.future.exception() is not None else "done"
+
+    def cancel(self):
+        """Queued jobs never start. A running worker cannot be interrupted
+        safely, so its result is discarded when it finishes."""
+        self.future.cancel()
+        self._cancelled = True
+
+    def discard(self):
+        """Release what the job left outside its result, once."""
+        discard, self._discard = self._discard, None
+        if discard is not None:
+            discard()
+
+    def profile(self) -> Optional[Dict[str, Any]]:
+        """The finished run's profile, with the time it spent queued as a "queue" stage."""
+        if self.status != "done":
+            return None
+        profile = self.future.result().get("profile")
+        if profile is None:
+            return None
+        stages = {"queue": max(0.0, profile["started_at"] - self.submitted_at), **profile["stages"]}
+        return dict(profile, stages=stages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Id and status; the result itself is shaped by the caller."""
+        status = self.status
+        info = {"backtest_id": self.id, "status": status, "submitted_at": self.submitted_at}
+        if status == "failed":
+            info["error"] = str(self.future.exception())
+        return info
+
+
+class JobQueue:
+    """Process pool plus the table of jobs keyed by content hash."""
+
+    def __init__(self, workers: Optional[int] = None, max_results: int = 256):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_results = max_results
+        self._pool = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is not None and self._pool._broken:
+            # A pool that lost a worker has failed its pending jobs, which are
+            # retried when submitted again, and accepts no more
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        if self._pool is None:
+            # Polars' thread pool does not survive fork
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(self, key: str, fn, *args, cleanup: Optional[Callable[[], None]] = None,
+               discard: Optional[Callable[[], None]] = None) -> Job:
+        """The job for key, starting fn(*args) unless a live or finished one exists.
+
+        Failed and cancelled jobs are retried. cleanup runs once args are no
+        longer needed: at once when an existing job is reused, otherwise
+        when the new job finishes. discard runs when a new job's result is
+        dropped: it fails, is cancelled or is evicted. A retry takes over
+        the key, and whatever discard would remove, so a job that is no
+        longer the one listed for its key is not discarded.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            reused = job is not None and job.status not in ("failed", "cancelled")
+            if reused:
+                self._jobs.move_to_end(key)
+            else:
+                try:
+                    future = self._executor().submit(fn, *args)
+                except BrokenProcessPool:
+                    # The pool broke after the check in _executor()
+                    future = self._executor().submit(fn, *args)
+                job = Job(key, future, discard)
+                self._jobs[key] = job
+                self._evict()
+        JOBS.labels(result="reused" if reused else "new").inc()
+        if not reused:
+            job.future.add_done_callback(lambda _: self._finished(job))
+        if cleanup is not None:
+            if reused:
+                cleanup()
+            else:
+                job.future.add_done_callback(lambda _: cleanup())
+        return job
+
+    def get(self, key: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key: str) -> Optional[Job]:
+        job = self.get(key)
+        if job is not None and job.status in ("queued", "running"):
+            job.cancel()
+        return job
+
+    def _finished(self, job: Job):
+        _observe_job(job)
+        # A running job cancelled earlier finishes here too
+        if job.status in ("failed", "cancelled"):
+            with self._lock:
+                if self._jobs.get(job.id) is job:
+                    job.discard()
+
+    def _evict(self):
+        # Oldest finished jobs go first; unfinished ones are never dropped
+        finished = [k for k, j in self._jobs.items() if j.future.done()]
+        for key in finished[:max(0, len(finished) - self.max_results)]:
+            self._jobs.pop(key).discard()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _observe_job(job: Job):
+    # Each run is recorded once, when it finishes, however often it is served
+    profile = job.profile()
+    if profile is not None:
+        observe(profile)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(
+                    workers=int(os.environ.get("BACKTEST_WORKERS", 0)) or None,
+                    max_results=int(os.environ.get("BACKTEST_RESULT_CACHE", 256))
+                )
+    return _queue
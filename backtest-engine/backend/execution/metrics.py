@@ -0,0 +1,178 @@
+"""Performance metrics as Polars expressions over returns and equity columns.
+
+Each builder returns an expression, so a whole set of metrics is computed in
+one select (or group_by().agg() for several series at once). Annualization
+assumes PERIODS_PER_YEAR bars per year.
+"""
+import math
+from typing import Dict, List, Optional
+
+import polars as pl
+
+PERIODS_PER_YEAR = 252
+DEFAULT_ROLLING_WINDOW = 63
+
+def sharpe_ratio(returns: pl.Expr, periods_per_year: int = PERIODS_PER_YEAR) -> pl.Expr:
+    return returns.mean() / returns.std(ddof=0) * periods_per_year ** 0.5
+
+def sortino_ratio(returns: pl.Expr, periods_per_year: int = PERIODS_PER_YEAR) -> pl.Expr:
+    downside = returns.clip(upper_bound=0).pow(2).mean().sqrt()
+    return returns.mean() / downside * periods_per_year ** 0.5
+
+def volatility(returns: pl.Expr, periods_per_year: int = PERIODS_PER_YEAR) -> pl.Expr:
+    return returns.std(ddof=0) * periods_per_year ** 0.5
+
+def drawdown(equity: pl.Expr) -> pl.Expr:
+    """Per-bar drawdown from the running peak (0 at a new high)."""
+    return equity / equity.cum_max() - 1
+
+def max_drawdown(equity: pl.Expr) -> pl.Expr:
+    return drawdown(equity).min()
+
+def max_drawdown_duration(equity: pl.Expr) -> pl.Expr:
+    """Longest run of consecutive bars below the running peak."""
+    # Bars since the last peak; built without over() so it also works in group_by().agg()
+    index = pl.int_range(pl.len())
+    last_peak = pl.when(equity >= equity.cum_max()).then(index).forward_fill().fill_null(-1)
+    return (index - last_peak).max().cast(pl.Int64)
+
+def cagr(equity: pl.Expr, initial_capital: float, periods_per_year: int = PERIODS_PER_YEAR) -> pl.Expr:
+    return (equity.last() / initial_capital).pow(periods_per_year / equity.len()) - 1
+
+def _finite(expr: pl.Expr) -> pl.Expr:
+    return pl.when(expr.is_finite()).then(expr).alias(expr.meta.output_name())
+
+def metric_exprs(returns: str, equity: str, initial_capital: float, position: Optional[str] = None,
+                 periods_per_year: int = PERIODS_PER_YEAR) -> List[pl.Expr]:
+    """The standard metric set; exposure is included when a position column is given."""
+    ret, eq = pl.col(returns), pl.col(equity)
+    growth = cagr(eq, initial_capital, periods_per_year)
+    worst = max_drawdown(eq)
+    exprs = [
+        (eq.last() / initial_capital - 1).alias("total_return"),
+        growth.alias("cagr"),
+        volatility(ret, periods_per_year).alias("volatility"),
+        sharpe_ratio(ret, periods_per_year).alias("sharpe_ratio"),
+        sortino_ratio(ret, periods_per_year).alias("sortino_ratio"),
+        worst.alias("max_drawdown"),
+        (growth / worst.abs()).alias("calmar_ratio"),
+        # Share of bars with a non-zero return that were gains
+        ((ret > 0).sum() / (ret != 0).sum()).alias("win_rate"),
+    ]
+    if position is not None:
+        exprs.append((pl.col(position) != 0).mean().alias("exposure"))
+    # Undefined ratios (no variance, no drawdown, no trades) come back as None
+    exprs = [_finite(e.cast(pl.Float64)) for e in exprs]
+    return exprs + [max_drawdown_duration(eq).alias("max_drawdown_duration")]
+
+def compute_metrics(bars: pl.DataFrame, initial_capital: float, returns: str = "strategy_returns",
+                    equity: str = "equity_curve", position: Optional[str] = "position") -> Dict[str, Optional[float]]:
+    if bars.is_empty():
+        return {}
+    if position is not None and position not in bars.columns:
+        position = None
+    return bars.select(metric_exprs(returns, equity, initial_capital, position)).row(0, named=True)
+
+def rolling_metrics(bars: pl.DataFrame, window: int = DEFAULT_ROLLING_WINDOW, returns: str = "strategy_returns",
+                    equity: str = "equity_curve", periods_per_year: int = PERIODS_PER_YEAR) -> pl.DataFrame:
+    """Rolling Sharpe over window bars, plus the drawdown series."""
+    if window < 2:
+        raise ValueError("rolling window must be at least 2 bars")
+    ret = pl.col(returns)
+    rolling_sharpe = ret.rolling_mean(window) / ret.rolling_std(window, ddof=0) * periods_per_year ** 0.5
+    return bars.select([
+        pl.col("timestamp"),
+        rolling_sharpe.fill_nan(None).alias("rolling_sharpe"),
+        drawdown(pl.col(equity)).alias("drawdown"),
+    ])
+
+
+class RunningMetrics:
+    """The metric_exprs() set accumulated over consecutive pieces of one series.
+
+    Keeps only running aggregates (count, mean and squared deviations of the
+    returns, peak equity, bars since the peak, ...), so memory does not grow
+    with the series. Results match compute_metrics() on the whole series up
+    to float rounding.
+    """
+
+    def __init__(self, initial_capital: float, periods_per_year: int = PERIODS_PER_YEAR):
+        self.initial_capital = initial_capital
+        self.periods_per_year = periods_per_year
+        self.count = 0
+        self.mean = 0.0
+        self.squared_deviations = 0.0
+        self.downside_squares = 0.0
+        self.wins = 0
+        self.nonzero = 0
+        self.exposed = 0
+        self.peak = None
+        self.since_peak = 0
+        self.max_drawdown = 0.0
+        self.max_drawdown_duration = 0
+        self.equity = initial_capital
+
+    def update(self, bars: pl.DataFrame, returns: str = "strategy_returns", equity: str = "equity_curve",
+               position: str = "position"):
+        if bars.is_empty():
+            return
+        ret, eq = pl.col(returns), pl.col(equity)
+        peak = eq.cum_max() if self.peak is None else pl.max_horizontal(eq.cum_max(), pl.lit(self.peak))
+        index = pl.int_range(pl.len())
+        last_peak = pl.when(eq >= peak).then(index).forward_fill()
+        # Bars before the first new peak extend the run carried from the last piece
+        since_peak = (index - last_peak).fill_null(index + 1 + self.since_peak)
+        piece = bars.select([
+            pl.len().alias("count"),
+            ret.mean().alias("mean"),
+            (ret - ret.mean()).pow(2).sum().alias("squared_deviations"),
+            ret.clip(upper_bound=0).pow(2).sum().alias("downside_squares"),
+            (ret > 0).sum().alias("wins"),
+            (ret != 0).sum().alias("nonzero"),
+            (pl.col(position) != 0).sum().alias("exposed"),
+            peak.max().alias("peak"),
+            (eq / peak - 1).min().alias("max_drawdown"),
+            since_peak.last().alias("since_peak"),
+            since_peak.max().alias("max_drawdown_duration"),
+            eq.last().alias("equity"),
+        ]).row(0, named=True)
+
+        # Chan et al.'s pairwise update of the mean and squared deviations
+        total = self.count + piece["count"]
+        delta = piece["mean"] - self.mean
+        self.squared_deviations += piece["squared_deviations"] + delta ** 2 * self.count * piece["count"] / total
+        self.mean += delta * piece["count"] / total
+        self.count = total
+        self.downside_squares += piece["downside_squares"]
+        self.wins += piece["wins"]
+        self.nonzero += piece["nonzero"]
+        self.exposed += piece["exposed"]
+        self.peak = piece["peak"]
+        self.since_peak = piece["since_peak"]
+        self.max_drawdown = min(self.max_drawdown, piece["max_drawdown"])
+        self.max_drawdown_duration = max(self.max_drawdown_duration, piece["max_drawdown_duration"])
+        self.equity = piece["equity"]
+
+    def result(self) -> Dict[str, Optional[float]]:
+        if not self.count:
+            return {}
+
+        def ratio(numerator: float, denominator: float) -> Optional[float]:
+            value = numerator / denominator if denominator else math.nan
+            return value if math.isfinite(value) else None
+
+        annualize = self.periods_per_year ** 0.5
+        std = math.sqrt(self.squared_deviations / self.count)
+        growth = (self.equity / self.initial_capital) ** (self.periods_per_year / self.count) - 1
+        return {
+            "total_return": self.equity / self.initial_capital - 1,
+            "cagr": growth,
+            "volatility": std * annualize,
+            "sharpe_ratio": ratio(self.mean * annualize, std),
+            "sortino_ratio": ratio(self.mean * annualize, math.sqrt(self.downside_squares / self.count)),
+            "max_drawdown": self.max_drawdown,
+            "calmar_ratio": ratio(growth, abs(self.max_drawdown)),
+            "win_rate": ratio(self.wins, self.nonzero),
+            "exposure": self.exposed / self.count,
+            "max_drawdown_duration": self.max_drawdown_duration,
+        }
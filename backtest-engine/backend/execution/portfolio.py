@@ -0,0 +1,138 @@
+"""One strategy over many symbols, evaluated in a single Polars pass.
+
+Indicators, signals and fills are window expressions over the Symbol
+column, so the work grows with total rows rather than with the number of
+symbols. Per-symbol strategy returns are then combined into one portfolio
+equity curve under fixed target weights.
+"""
+from typing import Dict, List, Optional
+
+import polars as pl
+
+from strategies.base import Strategy
+from execution.engine import columnar_fill
+from execution.metrics import metric_exprs
+from data_sources.indicator_store import load_indicators
+from telemetry import stage
+
+SYMBOL_COLUMN = "Symbol"
+
+# How often sleeves are reset to their target weights: every bar, at the
+# start of each calendar period, or never (weights drift with performance)
+REBALANCE_RULES = {"daily": None, "weekly": "1w", "monthly": "1mo", "quarterly": "1q", "none": None}
+
+def portfolio_weights(symbols: List[str], weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Target weights normalized to sum to one; equal weights by default."""
+    if not weights:
+        return {symbol: 1 / len(symbols) for symbol in symbols}
+    unknown = set(weights) - set(symbols)
+    if unknown:
+        raise ValueError(f"Weights given for symbols not in the portfolio: {', '.join(sorted(unknown))}")
+    total = sum(weights.get(symbol, 0) for symbol in symbols)
+    if total <= 0 or any(w < 0 for w in weights.values()):
+        raise ValueError("Weights must be non-negative with a positive sum")
+    return {symbol: weights.get(symbol, 0) / total for symbol in symbols}
+
+def symbol_signals(data: pl.DataFrame, strategy: Strategy, stored_indicators: bool = False) -> pl.DataFrame:
+    """Signals for every symbol, from the strategy's expressions windowed by symbol.
+
+    With stored_indicators, data holds stock DB rows and indicators are read
+    from the indicator store where it has them.
+    """
+    strategy.validate()
+    order = [SYMBOL_COLUMN, "date"] if "date" in data.columns else [SYMBOL_COLUMN]
+    data = data.sort(order, maintain_order=True)
+    columns = strategy.indicator_columns()
+    indicators = None
+    if stored_indicators:
+        with stage("indicators"):
+            indicators = load_indicators(data, strategy.indicators())
+    if indicators is not None:
+        data = data.hstack(indicators)
+        columns = {name: expr for name, expr in columns.items() if name not in indicators.columns}
+    return data.with_columns([
+        expr.over(SYMBOL_COLUMN).alias(name) for name, expr in columns.items()
+    ]).with_columns([
+        strategy.signal_expr().over(SYMBOL_COLUMN).alias("signals")
+    ])
+
+def combine_sleeves(bars: pl.DataFrame, weights: Dict[str, float], rebalance: str,
+                    initial_capital: float) -> pl.DataFrame:
+    """Portfolio equity from per-symbol strategy returns.
+
+    Symbols without a bar on some date contribute a zero return for it.
+    Rebalancing trades between sleeves are not charged costs.
+    """
+    if rebalance not in REBALANCE_RULES:
+        raise ValueError(f"rebalance must be one of {', '.join(REBALANCE_RULES)}")
+    every = REBALANCE_RULES[rebalance]
+    if every and not bars.schema["timestamp"].is_temporal():
+        raise ValueError(f"{rebalance} rebalancing needs a date column")
+
+    if rebalance == "daily":
+        period = pl.col("timestamp")
+    elif rebalance == "none":
+        period = pl.lit(0)
+    else:
+        period = pl.col("timestamp").dt.truncate(every)
+
+    weight_frame = pl.DataFrame({SYMBOL_COLUMN: list(weights), "weight": list(weights.values())})
+    grid = (
+        bars.select("timestamp").unique()
+        .join(weight_frame, how="cross")
+        .join(bars.select(SYMBOL_COLUMN, "timestamp", "strategy_returns"), on=[SYMBOL_COLUMN, "timestamp"], how="left")
+        .with_columns(pl.col("strategy_returns").fill_null(0), period.alias("period"))
+        .sort([SYMBOL_COLUMN, "timestamp"])
+        # Growth of each sleeve since its last reset to target weight
+        .with_columns((pl.col("strategy_returns") + 1).cum_prod().over([SYMBOL_COLUMN, "period"]).alias("sleeve"))
+    )
+    portfolio = grid.group_by("timestamp").agg([
+        pl.col("period").first(),
+        (pl.col("weight") * pl.col("sleeve")).sum().alias("growth"),
+    ]).sort("timestamp")
+
+    # Equity at the start of each period carries the growth of all earlier ones
+    starts = portfolio.group_by("period", maintain_order=True).agg(
+        pl.col("growth").last()
+    ).select([
+        pl.col("period"),
+        pl.col("growth").cum_prod().shift(1).fill_null(1).alias("start"),
+    ])
+    return portfolio.join(starts, on="period", how="left").select([
+        pl.col("timestamp"),
+        (pl.col("start") * pl.col("growth") * initial_capital).alias("equity_curve"),
+    ]).with_columns(
+        pl.col("equity_curve").pct_change().fill_null(pl.col("equity_curve") / initial_capital - 1).alias("returns")
+    )
+
+def run_portfolio_backtest(data: pl.DataFrame, strategy: Strategy, initial_capital: float,
+                           weights: Optional[Dict[str, float]] = None, rebalance: str = "daily",
+                           stored_indicators: bool = False, **fill_params):
+    """Returns (portfolio metrics, per-symbol metrics, portfolio equity, trades).
+
+    fill_params are passed to columnar_fill. Each symbol is filled as if it
+    held the whole capital; weights are applied when sleeves are combined.
+    stored_indicators is passed to symbol_signals.
+    """
+    symbols = data.get_column(SYMBOL_COLUMN).unique(maintain_order=True).to_list()
+    target = portfolio_weights(symbols, weights)
+    with stage("signals"):
+        signals = symbol_signals(data, strategy, stored_indicators)
+    with stage("fill"):
+        bars, trades = columnar_fill(signals, initial_capital=initial_capital, by=SYMBOL_COLUMN, **fill_params)
+        equity = combine_sleeves(bars, target, rebalance, initial_capital)
+
+    with stage("metrics"):
+        metrics = equity.select(metric_exprs("returns", "equity_curve", initial_capital)).row(0, named=True)
+        trade_counts = trades.group_by(SYMBOL_COLUMN).len("trades")
+        symbol_metrics = (
+            bars.group_by(SYMBOL_COLUMN, maintain_order=True)
+            .agg(metric_exprs("strategy_returns", "equity_curve", initial_capital, position="position"))
+            .join(trade_counts, on=SYMBOL_COLUMN, how="left")
+            .with_columns(
+                pl.col("trades").fill_null(0),
+                pl.col(SYMBOL_COLUMN).replace_strict(target, return_dtype=pl.Float64).alias("weight")
+            )
+            .sort(SYMBOL_COLUMN)
+        )
+    return metrics, symbol_metrics, equity.drop("returns"), trades
@@ -0,0 +1,112 @@
+"""Backtest results in the shapes the API returns.
+
+Results are kept as typed frames and only shaped at response time, so one
+cached result can be sent as rows, as parallel column arrays or as Arrow
+IPC, at full resolution or downsampled for charting.
+"""
+import json
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import orjson
+import polars as pl
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Row positions kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        following = slice(end, min(int((i + 2) * every) + 1, n))
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+def downsample(frame: pl.DataFrame, points: int, x: str = "timestamp", y: str = "equity") -> pl.DataFrame:
+    """At most points rows of frame, chosen by LTTB on (x, y)."""
+    if points < 3:
+        raise ValueError("downsample needs at least 3 points")
+    if frame.height <= points:
+        return frame
+    xs = frame.get_column(x)
+    xs = xs.to_physical().cast(pl.Float64).to_numpy() if xs.dtype.is_temporal() else np.arange(frame.height, dtype=np.float64)
+    ys = frame.get_column(y).cast(pl.Float64).to_numpy()
+    return frame[lttb_indices(xs, ys, points)]
+
+def _with_string_times(frame: pl.DataFrame) -> pl.DataFrame:
+    return frame.with_columns(pl.col(pl.Date, pl.Datetime).cast(pl.String))
+
+def frame_rows(frame: pl.DataFrame) -> list:
+    return _with_string_times(frame).to_dicts()
+
+def frame_columns(frame: pl.DataFrame) -> Dict[str, Any]:
+    """Parallel arrays; numeric columns go to orjson as numpy arrays."""
+    frame = _with_string_times(frame)
+    return {
+        name: series.to_numpy() if series.dtype.is_numeric() and series.null_count() == 0 else series.to_list()
+        for name, series in frame.to_dict().items()
+    }
+
+def to_json(payload: Dict[str, Any], columnar: bool = False) -> bytes:
+    shape = frame_columns if columnar else frame_rows
+    body = {k: shape(v) if isinstance(v, pl.DataFrame) else v for k, v in payload.items()}
+    return orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def to_arrow_ipc(series: pl.DataFrame, payload: Dict[str, Any]) -> bytes:
+    """The bar series as an Arrow IPC stream; the other payload entries
+    (id, metrics, trades, ...) ride along as JSON in the schema metadata."""
+    import pyarrow as pa
+
+    table = series.to_arrow()
+    metadata = {
+        k: json.dumps(frame_rows(v) if isinstance(v, pl.DataFrame) else v)
+        for k, v in payload.items()
+    }
+    table = table.replace_schema_metadata(metadata)
+    sink = BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def shape_result(result: Dict[str, Any], points: Optional[int] = None) -> Dict[str, Any]:
+    """result with the equity curve downsampled to points, and any rolling
+    metrics cut to the same bars."""
+    if not points:
+        return result
+    shaped = dict(result, equity_curve=downsample(result["equity_curve"], points))
+    if result.get("rolling_metrics") is not None:
+        kept = shaped["equity_curve"].get_column("timestamp").implode()
+        shaped["rolling_metrics"] = result["rolling_metrics"].filter(pl.col("timestamp").is_in(kept))
+    return shaped
+
+def bar_series(result: Dict[str, Any]) -> pl.DataFrame:
+    """Equity curve with the rolling metric columns alongside, when present."""
+    series = result["equity_curve"]
+    if result.get("rolling_metrics") is not None:
+        series = series.join(result["rolling_metrics"], on="timestamp", how="left", maintain_order="left")
+    return series
+
+def render(payload: Dict[str, Any], accept: str = "", columnar: bool = False,
+           points: Optional[int] = None) -> Tuple[bytes, str]:
+    """(body, media type) for a result payload, as Arrow IPC when accept asks for it."""
+    payload = shape_result(payload, points)
+    # Arrow needs a bar series; summaries (e.g. streaming runs) are always JSON
+    if ARROW_STREAM in accept and "equity_curve" in payload:
+        rest = {k: v for k, v in payload.items() if k not in ("equity_curve", "rolling_metrics")}
+        return to_arrow_ipc(bar_series(payload), rest), ARROW_STREAM
+    return to_json(payload, columnar), "application/json"
@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import product
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import polars as pl
+
+from strategies.strategy_factor import StrategyFactory
+from data_sources.indicator_store import load_indicators
+
+# Combinations evaluated per wide frame; also the unit of work for the process pool
+BLOCK_SIZE = 500
+METRIC_NAMES = ("sharpe_ratio", "total_return", "max_drawdown", "trades")
+
+def param_values(spec) -> List[Any]:
+    """A list of values, a scalar, or an inclusive {"start", "stop", "step"} range."""
+    if isinstance(spec, dict):
+        start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+        if all(isinstance(v, int) for v in (start, stop, step)):
+            return list(range(start, stop + 1, step))
+        return [float(v) for v in np.arange(start, stop + step / 2, step)]
+    if isinstance(spec, list):
+        return spec
+    return [spec]
+
+def expand_grid(strategy_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every valid strategy config in the parameter grid."""
+    strategy_type = strategy_config.get("type")
+    names = [k for k in strategy_config if k != "type"]
+    configs = []
+    for values in product(*(param_values(strategy_config[k]) for k in names)):
+        config = {"type": strategy_type, **dict(zip(names, values))}
+        strategy = StrategyFactory.create_strategy(config)
+        try:
+            strategy.validate()
+        except ValueError:
+            continue
+        if config.get("short_window", 0) >= config.get("long_window", float("inf")):
+            continue
+        configs.append(config)
+    return configs
+
+def evaluate_block(frame: pl.DataFrame, configs: List[Dict[str, Any]]) -> pl.DataFrame:
+    """Metrics for a block of configs, from one wide frame of signal and return columns."""
+    strategies = [StrategyFactory.create_strategy(c) for c in configs]
+    signals = frame.select(
+        pl.col("returns"),
+        *[s.signal_expr().alias(f"sig_{i}") for i, s in enumerate(strategies)]
+    )
+    wide = signals.with_columns([
+        (pl.col(f"sig_{i}").shift(1).fill_null(0) * pl.col("returns")).alias(f"ret_{i}")
+        for i in range(len(strategies))
+    ])
+
+    exprs = []
+    for i in range(len(strategies)):
+        ret = pl.col(f"ret_{i}")
+        sig = pl.col(f"sig_{i}")
+        growth = (ret + 1).cum_prod()
+        exprs += [
+            (ret.mean() / ret.std(ddof=0) * np.sqrt(252)).alias(f"sharpe_ratio_{i}"),
+            ((ret + 1).product() - 1).alias(f"total_return_{i}"),
+            (growth / growth.cum_max() - 1).min().alias(f"max_drawdown_{i}"),
+            ((sig != sig.shift(1).fill_null(0)) & (sig != 0)).sum().alias(f"trades_{i}"),
+        ]
+    row = wide.select(exprs).row(0, named=True)
+    return pl.DataFrame([
+        {**{k: v for k, v in config.items() if k != "type"},
+         **{name: row[f"{name}_{i}"] for name in METRIC_NAMES}}
+        for i, config in enumerate(configs)
+    ])
+
+def sweep_frame(data: pl.DataFrame, configs: List[Dict[str, Any]], symbol: Optional[str] = None) -> pl.DataFrame:
+    """Close returns plus every distinct indicator column the grid needs, computed once.
+
+    With symbol, data holds that symbol's stock DB rows and indicators are
+    read from the indicator store where it has them.
+    """
+    columns, indicators = {}, {}
+    for config in configs:
+        strategy = StrategyFactory.create_strategy(config)
+        columns.update(strategy.indicator_columns())
+        indicators.update(strategy.indicators())
+    stored = load_indicators(data, indicators, symbol) if symbol is not None else None
+    if stored is not None:
+        data = data.hstack(stored)
+    return data.select(
+        pl.col("close").pct_change().fill_null(0).alias("returns"),
+        *[pl.col(name) if stored is not None and name in stored.columns else expr.alias(name)
+          for name, expr in columns.items()]
+    )
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_sweep_pool() -> ProcessPoolExecutor:
+    """Worker processes shared by every sweep, started on first use and
+    restarted once a worker dies."""
+    global _pool
+    if _pool is None or _pool._broken:
+        with _pool_lock:
+            if _pool is not None and _pool._broken:
+                # A pool that lost a worker fails every pending call and accepts no more
+                _pool.shutdown(wait=False)
+                _pool = None
+            if _pool is None:
+                # Polars' thread pool does not survive fork
+                _pool = ProcessPoolExecutor(
+                    max_workers=os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def shutdown_sweep_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+# In a worker: the sweep it last evaluated a block of, and that sweep's frame
+_worker_frame = (None, None)
+
+def evaluate_shared_block(sweep_id: str, path: str, configs: List[Dict[str, Any]]) -> pl.DataFrame:
+    """evaluate_block() on the sweep frame at path, read once per worker and sweep.
+
+    The frame is cached by sweep_id, not path: a later sweep may be given
+    the same temporary file name.
+    """
+    global _worker_frame
+    if _worker_frame[0] != sweep_id:
+        # Memory mapped, so workers share the pages rather than copying the frame
+        _worker_frame = (sweep_id, pl.read_ipc(path))
+    return evaluate_block(_worker_frame[1], configs)
+
+def run_sweep(data: pl.DataFrame, strategy_config: Dict[str, Any], initial_capital: float,
+              sort_by: str = "sharpe_ratio", top_n: int = 50, parallel: bool = True,
+              symbol: Optional[str] = None):
+    configs = expand_grid(strategy_config)
+    if not configs:
+        raise ValueError("Parameter grid has no valid combinations")
+    if sort_by not in METRIC_NAMES:
+        raise ValueError(f"sort_by must be one of {', '.join(METRIC_NAMES)}")
+    frame = sweep_frame(data, configs, symbol)
+
+    blocks = [configs[i:i + BLOCK_SIZE] for i in range(0, len(configs), BLOCK_SIZE)]
+    workers = min(len(blocks), os.cpu_count() or 1)
+    if parallel and workers > 1:
+        # Workers read the frame from an Arrow IPC file instead of each
+        # block carrying a pickled copy
+        fd, path = tempfile.mkstemp(prefix="sweep-", suffix=".arrow")
+        os.close(fd)
+        try:
+            frame.write_ipc(path)
+            sweep_id = uuid.uuid4().hex
+            args = ([sweep_id] * len(blocks), [path] * len(blocks), blocks)
+            try:
+                results = list(get_sweep_pool().map(evaluate_shared_block, *args))
+            except BrokenProcessPool:
+                # A worker died, e.g. killed for memory: run once more on a new pool
+                results = list(get_sweep_pool().map(evaluate_shared_block, *args))
+        finally:
+            os.remove(path)
+    else:
+        results = [evaluate_block(frame, block) for block in blocks]
+
+    ranked = pl.concat(results, how="diagonal_relaxed").with_columns(
+        # Flat strategies have zero volatility; rank them last rather than first
+        pl.col("sharpe_ratio").fill_nan(None),
+        ((pl.col("total_return") + 1) * initial_capital).alias("final_equity")
+    )
+    return len(configs), ranked.sort(sort_by, descending=True, nulls_last=True).head(top_n)
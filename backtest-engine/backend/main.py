@@ -1,23 +1,54 @@
-from fastapi import FastAPI, HTTPException, Form, UploadFile, File
+from fastapi import FastAPI, HTTPException, Form, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import uuid
 import json
-import numpy as np
-from io import StringIO
-import quantstats as qs
+import time
+import asyncio
+from contextlib import asynccontextmanager
+import polars as pl
 
 # Import your modular backend code
 from strategies.strategy_factor import StrategyFactory
-from data_sources.stock_db import load_from_stock_db
-from data_sources.custom_upload import load_from_upload
-from execution.engine import simple_market_fill
+from data_sources.stock_db import load_from_stock_db, data_version, DataNotFoundError
+from data_sources.custom_upload import load_from_upload, spool_upload, remove_upload
+from data_sources.schema import DATE_COLUMN
+from execution.engine import REQUIRED_COLUMNS
+from execution.sweep import run_sweep, shutdown_sweep_pool
+from execution.portfolio import run_portfolio_backtest, SYMBOL_COLUMN
+from execution.jobs import get_job_queue, job_key, run_backtest, run_streaming_job, stream_output_dir, remove_stream_output, Job
+from execution.results import render, ARROW_STREAM
+from telemetry import (CONTENT_TYPE, REQUEST_SECONDS, STAGE_SECONDS, render as render_metrics,
+                       profiling, stage, rows, observe, server_timing)
+from starlette.concurrency import run_in_threadpool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    get_job_queue().shutdown()
+    shutdown_sweep_pool()
 
 # Initialize FastAPI app
-app = FastAPI(title="Backtesting Engine")
+app = FastAPI(title="Backtesting Engine", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, so backtest ids do not become series
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    ).observe(time.perf_counter() - start)
+    return response
+
+# Response fields that do not change the result, kept out of job keys
+RESPONSE_OPTIONS = {"columnar", "downsample", "profile"}
+
 # Pydantic models for request/response validation
 class BacktestRequest(BaseModel):
     symbol: Optional[str] = None
@@ -25,82 +56,346 @@ class BacktestRequest(BaseModel):
     end_date: Optional[str] = None    # ISO format, e.g., "2025-01-01"
     strategy: Dict[str, Any]          # e.g., {"type": "ma_crossover", "short_window": 50, "long_window": 200}
     initial_capital: float
+    commission: float = 0.0           # fraction of traded notional, e.g., 0.001 for 10 bps
+    slippage: float = 0.0             # fraction of price paid on each fill
+    position_size: float = 1.0        # fraction of equity per unit of signal
+    mode: str = "long_short"          # or "long_only"
+    rolling_window: Optional[int] = None  # bars; adds rolling Sharpe and drawdown series when set
+    columnar: bool = False            # parallel arrays instead of one object per row
+    downsample: Optional[int] = None  # LTTB the equity curve to this many points; full resolution when unset
+    profile: bool = False             # add a per-stage timing breakdown to the response
+
+class StreamRequest(BaseModel):
+    symbol: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    strategy: Dict[str, Any]
+    initial_capital: float
+    commission: float = 0.0
+    slippage: float = 0.0
+    position_size: float = 1.0
+    mode: str = "long_short"
+    batch_rows: int = 1_000_000       # bars held in memory at a time
+
+class SweepRequest(BaseModel):
+    symbol: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    strategy: Dict[str, Any]          # parameter ranges, e.g., {"type": "ma_crossover", "short_window": {"start": 5, "stop": 50, "step": 5}, "long_window": [100, 150, 200]}
+    initial_capital: float
+    sort_by: str = "sharpe_ratio"
+    top_n: int = 50
+    profile: bool = False
+
+class PortfolioRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # all symbols in the uploaded file when omitted
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    strategy: Dict[str, Any]
+    initial_capital: float
+    weights: Optional[Dict[str, float]] = None  # equal weights when omitted
+    rebalance: str = "daily"          # "daily", "weekly", "monthly", "quarterly" or "none"
+    commission: float = 0.0
+    slippage: float = 0.0
+    position_size: float = 1.0
+    mode: str = "long_short"
+    columnar: bool = False
+    downsample: Optional[int] = None
+    profile: bool = False
 
-# TODO add QuantStats library for metrics
 class BacktestResponse(BaseModel):
     backtest_id: str
     metrics: Dict
     equity_curve: List[Dict]
     trades: List[Dict]
+    rolling_metrics: Optional[List[Dict]] = None
+    profile: Optional[Dict] = None    # stages (seconds), rows and upstream calls, when requested
+
+class PortfolioResponse(BacktestResponse):
+    symbol_metrics: List[Dict]
 
 @app.get("/")
 async def read_root():
     return {"message": "Hello World"}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Stage timings, row counts, upstream calls and request latency in Prometheus text format."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+async def load_data(file: Optional[UploadFile], symbol, start_date: Optional[str],
+                    end_date: Optional[str], columns: List[str]) -> pl.DataFrame:
+    """Uploaded data, or rows for one or more symbols from the stock DB."""
+    if file:
+        path, _ = await run_in_threadpool(spool_upload, file.file)
+        try:
+            # Uploads may leave out dates; bars are then numbered (see columnar_fill)
+            return await run_in_threadpool(load_from_upload, path, columns, [DATE_COLUMN])
+        finally:
+            remove_upload(path)
+    if not symbol or not start_date or not end_date:
+        raise HTTPException(
+            status_code=400,
+            detail="Symbol and date range required when not using custom data"
+        )
+    return await run_in_threadpool(
+        load_from_stock_db,
+        symbol=symbol,
+        start_date=start_date,
+        end_date=end_date,
+        columns=columns
+    )
+
+
+async def render_response(http_request: Request, payload: Dict[str, Any], columnar: bool,
+                          downsample: Optional[int], profile: Optional[Dict[str, Any]] = None) -> Response:
+    """JSON rows, JSON columns or Arrow IPC (by Accept header), serialized off the event loop.
+
+    With a profile, its breakdown goes in the body and, together with the
+    serialization time, in a Server-Timing header.
+    """
+    if profile is not None:
+        payload = dict(payload, profile=profile)
+    start = time.perf_counter()
+    body, media_type = await run_in_threadpool(
+        render, payload, http_request.headers.get("accept", ""), columnar, downsample
+    )
+    elapsed = time.perf_counter() - start
+    STAGE_SECONDS.labels(stage="serialize").observe(elapsed)
+    headers = None
+    if profile is not None:
+        headers = {"Server-Timing": server_timing(dict(profile["stages"], serialize=elapsed))}
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def rendered_responses(model) -> Dict[int, Dict[str, Any]]:
+    """OpenAPI description of a route answering through render_response().
+
+    model describes the JSON body with rows; with columnar the series are
+    column arrays instead. Accept: application/vnd.apache.arrow.stream gets
+    the bars as an Arrow IPC stream.
+    """
+    return {200: {"model": model, "content": {ARROW_STREAM: {}}}}
+
+def job_payload(job: Job, profile: bool) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """A finished job's result for a response, and its profile if requested."""
+    result = {k: v for k, v in job.future.result().items() if k != "profile"}
+    return result, job.profile() if profile else None
+
+async def submit_backtest(file: Optional[UploadFile], request: BaseModel, job=run_backtest) -> Job:
+    """Queue a backtest, or return the job already holding its result."""
+    # Bad strategy configs are rejected here rather than in a worker
+    StrategyFactory.create_strategy(request.strategy).validate()
+    # Response shaping does not change the result, so it stays out of the key
+    params = request.model_dump(exclude=RESPONSE_OPTIONS)
+    if file:
+        start = time.perf_counter()
+        upload, digest = await run_in_threadpool(spool_upload, file.file)
+        STAGE_SECONDS.labels(stage="upload").observe(time.perf_counter() - start)
+        identity = {"upload": digest}
+    else:
+        if not request.symbol or not request.start_date or not request.end_date:
+            raise HTTPException(
+                status_code=400,
+                detail="Symbol and date range required when not using custom data"
+            )
+        upload = None
+        identity = {"source": await run_in_threadpool(data_version)}
+    key = job_key(identity, {"job": job.__name__, **params})
+    discard = None
+    if job is run_streaming_job:
+        params["output_dir"] = output_dir = stream_output_dir(key)
+        discard = lambda: remove_stream_output(output_dir)
+    cleanup = (lambda: remove_upload(upload)) if upload else None
+    return get_job_queue().submit(key, job, params, upload, cleanup=cleanup, discard=discard)
 
-@app.post("/backtest", response_model=BacktestResponse)
+@app.post("/backtest", response_class=Response, responses=rendered_responses(BacktestResponse))
 async def run_backtest_endpoint(
+    http_request: Request,
     file: Optional[UploadFile] = File(None),
     params: str = Form(...)
 ):
     try:
-        # Parse params JSON
-        params_dict = json.loads(params)
-        request = BacktestRequest(**params_dict)
-        print(params_dict)
-        print(request)
+        request = BacktestRequest(**json.loads(params))
+
+        job = await submit_backtest(file, request)
+        try:
+            # Shielded: a client disconnecting must not cancel a job others may share
+            await asyncio.shield(asyncio.wrap_future(job.future))
+        except asyncio.CancelledError:
+            if job.status != "cancelled":
+                raise
+        if job.status == "cancelled":
+            raise HTTPException(status_code=409, detail="Backtest was cancelled")
+
+        result, profile = job_payload(job, request.profile)
+        return await render_response(http_request, {"backtest_id": job.id, **result},
+                                     request.columnar, request.downsample, profile)
         
-        # Load data
-        if file:
-            contents = await file.read()
-            s_io = StringIO(contents.decode('utf-8'))
-            data = load_from_upload(s_io)
-        else:
-            if not request.symbol or not request.start_date or not request.end_date:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Symbol and date range required when not using custom data"
+    except HTTPException:
+        raise
+    except DataNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@app.post("/backtest/jobs", status_code=202)
+async def submit_backtest_endpoint(
+    file: Optional[UploadFile] = File(None),
+    params: str = Form(...)
+):
+    """Queue a backtest and return its id at once; poll GET /backtest/{id}."""
+    try:
+        request = BacktestRequest(**json.loads(params))
+        job = await submit_backtest(file, request)
+        return {"backtest_id": job.id, "status": job.status}
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@app.post("/backtest/stream", status_code=202)
+async def submit_streaming_endpoint(
+    file: Optional[UploadFile] = File(None),
+    params: str = Form(...)
+):
+    """Queue an out-of-core backtest for long histories; poll GET /backtest/{id}
+    for its metrics and the Parquet directories holding bars and trades."""
+    try:
+        request = StreamRequest(**json.loads(params))
+        if request.batch_rows <= 0:
+            raise ValueError("batch_rows must be positive")
+        job = await submit_backtest(file, request, job=run_streaming_job)
+        return {"backtest_id": job.id, "status": job.status}
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@app.get("/backtest/{backtest_id}")
+async def get_backtest_endpoint(http_request: Request, backtest_id: str, columnar: bool = False,
+                                downsample: Optional[int] = None, profile: bool = False):
+    job = get_job_queue().get(backtest_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No backtest {backtest_id}")
+    info = job.to_dict()
+    if info["status"] != "done":
+        return info
+    try:
+        result, breakdown = job_payload(job, profile)
+        return await render_response(http_request, {**info, **result}, columnar, downsample, breakdown)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+
+@app.delete("/backtest/{backtest_id}")
+async def cancel_backtest_endpoint(backtest_id: str):
+    job = get_job_queue().cancel(backtest_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No backtest {backtest_id}")
+    return {"backtest_id": job.id, "status": job.status}
+
+@app.post("/backtest/sweep")
+async def run_sweep_endpoint(
+    file: Optional[UploadFile] = File(None),
+    params: str = Form(...)
+):
+    try:
+        request = SweepRequest(**json.loads(params))
+        with profiling() as profile:
+            with stage("load"):
+                data = await load_data(file, request.symbol, request.start_date, request.end_date, REQUIRED_COLUMNS)
+            rows("input", data.height)
+
+            # Grid evaluation is CPU bound; keep it off the event loop
+            with stage("sweep"):
+                combinations, ranked = await run_in_threadpool(
+                    run_sweep,
+                    data,
+                    request.strategy,
+                    request.initial_capital,
+                    sort_by=request.sort_by,
+                    top_n=request.top_n,
+                    # Stored indicators are keyed by symbol, so only for stock DB data
+                    symbol=None if file else request.symbol
                 )
-            data = load_from_stock_db(
-                symbol=request.symbol,
-                start_date=request.start_date,
-                end_date=request.end_date
-            )
-        
-        # Create and run strategy
-        strategy = StrategyFactory.create_strategy(request.strategy)
-        data_with_signals = strategy.generate_signals(data)
-        print("signals data", data_with_signals["signals"])
-        
-        # Run backtest
-        equity_dict, returns_dict, trades = simple_market_fill(
-            data_with_signals,
-            initial_capital=request.initial_capital,
-            return_trades=True
-        )
-        
-        # Calculate metrics
-        ret_arr = np.array(list(returns_dict.values()))
-        # print(ret_arr)
-        metrics = {
-            "sharpe_ratio": float(np.mean(ret_arr) / np.std(ret_arr) * np.sqrt(252)) if len(ret_arr) > 1 else 0.0,
-            "total_return": float(ret_arr[-1]) if len(ret_arr) > 0 else 0.0
+        observe(profile.to_dict())
+
+        response = {
+            "sweep_id": str(uuid.uuid4()),
+            "combinations": combinations,
+            "results": ranked.to_dicts()
         }
-        
-        # Format equity curve
-        equity_curve = [
-            {"timestamp": str(ts), "equity": float(eq)} 
-            for ts, eq in equity_dict.items()
-        ]
-
-    
-        return BacktestResponse(
-            backtest_id=str(uuid.uuid4()),
-            metrics=metrics,
-            equity_curve=equity_curve,
-            trades=trades
-        )
-        
+        if request.profile:
+            response["profile"] = profile.to_dict()
+        return response
+
+    except HTTPException:
+        raise
+    except DataNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@app.post("/backtest/portfolio", response_class=Response, responses=rendered_responses(PortfolioResponse))
+async def run_portfolio_endpoint(
+    http_request: Request,
+    file: Optional[UploadFile] = File(None),
+    params: str = Form(...)
+):
+    try:
+        request = PortfolioRequest(**json.loads(params))
+        strategy = StrategyFactory.create_strategy(request.strategy)
+        if not file and not request.symbols:
+            raise HTTPException(status_code=400, detail="Symbols required when not using custom data")
+
+        with profiling() as profile:
+            # One query for every symbol
+            columns = list(dict.fromkeys([SYMBOL_COLUMN] + REQUIRED_COLUMNS + strategy.required_columns()))
+            with stage("load"):
+                data = await load_data(file, request.symbols, request.start_date, request.end_date, columns)
+            if SYMBOL_COLUMN not in data.columns:
+                raise HTTPException(status_code=400, detail=f"Portfolio data needs a {SYMBOL_COLUMN} column")
+            if file and request.symbols:
+                data = data.filter(pl.col(SYMBOL_COLUMN).is_in(request.symbols))
+            rows("input", data.height)
+
+            metrics, symbol_metrics, equity, trades = await run_in_threadpool(
+                run_portfolio_backtest,
+                data,
+                strategy,
+                request.initial_capital,
+                weights=request.weights,
+                rebalance=request.rebalance,
+                stored_indicators=not file,
+                commission=request.commission,
+                slippage=request.slippage,
+                position_size=request.position_size,
+                mode=request.mode
+            )
+            rows("trades", trades.height)
+        observe(profile.to_dict())
+
+        return await render_response(http_request, {
+            "backtest_id": str(uuid.uuid4()),
+            "metrics": metrics,
+            "symbol_metrics": symbol_metrics,
+            "equity_curve": equity.rename({"equity_curve": "equity"}),
+            "trades": trades
+        }, request.columnar, request.downsample, profile.to_dict() if request.profile else None)
+
+    except HTTPException:
+        raise
+    except DataNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
     except Exception as e:
@@ -1,23 +1,132 @@
 from abc import ABC, abstractmethod
 import logging
+from typing import Optional, Sequence, Tuple
+
 import polars as pl
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+class Indicator(ABC):
+    """One indicator column over closes, in batch and bar-by-bar form.
+
+    build() and extend() give the values expr() would over the same closes,
+    bit for bit, so an indicator computed once (see data_sources.indicator_store)
+    can be continued as new bars arrive instead of recomputed.
+    """
+
+    @abstractmethod
+    def expr(self) -> pl.Expr:
+        """The indicator as an expression over the close column."""
+
+    @abstractmethod
+    def initial_state(self) -> dict:
+        """Running state before any bar; plain values only, safe to store as JSON."""
+
+    @abstractmethod
+    def push(self, state: dict, close: float) -> Optional[float]:
+        """Fold one close into state and return the indicator value for it."""
+
+    def build(self, close: pl.Series) -> Tuple[pl.Series, dict]:
+        """Values over a whole series and the state after its last bar.
+
+        Folds every close through push(); subclasses derive the state from
+        the batch expression instead.
+        """
+        state = self.initial_state()
+        return pl.Series([self.push(state, float(c)) for c in close], dtype=pl.Float64), state
+
+    def extend(self, state: dict, close: Sequence[float]) -> pl.Series:
+        """Values for closes that follow the ones folded into state."""
+        return pl.Series([self.push(state, float(c)) for c in close], dtype=pl.Float64)
+
+
 class Strategy(ABC):
     def __init__(self, name):
         self.name = name
         self.logger = logging.getLogger(f"Strategy.{name}")
 
-    @abstractmethod
-    def generate_signals(self, data: pl.DataFrame) -> pl.DataFrame:
+    def generate_signals(self, data: pl.DataFrame,
+                         indicators: Optional[pl.DataFrame] = None) -> pl.DataFrame:
         """Generate trading signals for the given data.
         
         Args:
             data: DataFrame with OHLCV data
+            indicators: precomputed indicator columns, row for row with data
+                (e.g. from the indicator store); only the rest are computed
             
         Returns:
-            DataFrame with signals column added
+            DataFrame with indicator and signals columns added
+        """
+        self.logger.info(f"Generating {self.name} signals")
+        self.validate()
+        return self.lazy_signals(data.lazy(), indicators).collect()
+
+    def lazy_signals(self, data: pl.LazyFrame,
+                     indicators: Optional[pl.DataFrame] = None) -> pl.LazyFrame:
+        """Indicator and signals columns added to a lazy query plan."""
+        columns = self.indicator_columns()
+        if indicators is not None:
+            stored = [name for name in indicators.columns if name in columns]
+            # Rows line up one to one, so the join is positional
+            data = pl.concat([data, indicators.lazy().select(stored)], how="horizontal")
+            columns = {name: expr for name, expr in columns.items() if name not in stored}
+        return data.with_columns([
+            expr.alias(name) for name, expr in columns.items()
+        ]).with_columns([
+            self.signal_expr().alias("signals")
+        ])
+
+    def required_columns(self) -> list:
+        """Input columns read by generate_signals()."""
+        return ["close"]
+
+    def validate(self):
+        """Raise ValueError if the strategy parameters are unusable."""
+        pass
+
+    def lookback(self) -> Optional[int]:
+        """Bars of history the signal on a bar depends on, or None if unbounded.
+
+        Evaluating the signals over the preceding lookback() bars plus a batch
+        gives the batch the same signals as evaluating the whole history.
+        """
+        return None
+
+    @abstractmethod
+    def indicator_columns(self) -> dict:
+        """Indicator expressions over the OHLCV columns, keyed by column name.
+
+        Names encode the indicator parameters (e.g. "sma_50") so strategies
+        that need the same indicator share one computed column.
+        """
+
+    def indicators(self) -> dict:
+        """The indicator_columns() that have an Indicator, keyed by column name.
+
+        Only these can be read from the indicator store; the rest are always
+        computed.
+        """
+        return {}
+
+    @abstractmethod
+    def signal_expr(self) -> pl.Expr:
+        """Int8 signals expression (1 long, -1 short, 0 flat) over the
+        columns from indicator_columns()."""
+
+    def initial_state(self) -> dict:
+        """Incremental state before any bar has been seen."""
+        raise NotImplementedError(f"{self.name} does not support incremental evaluation")
+
+    def step(self, state: dict, close: float) -> int:
+        """Fold one bar into state and return its signal."""
+        raise NotImplementedError(f"{self.name} does not support incremental evaluation")
+
+    def update_signals(self, state: dict, data: pl.DataFrame) -> pl.DataFrame:
+        """Signals for bars that follow the ones already folded into state.
+
+        Feeding a series in any number of pieces gives the same signals as
+        generate_signals() on the whole series; only the signals column is added.
         """
-        pass
\ No newline at end of file
+        signals = [self.step(state, float(close)) for close in data.get_column("close")]
+        return data.with_columns(pl.Series("signals", signals, dtype=pl.Int8))
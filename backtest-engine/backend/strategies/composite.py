@@ -0,0 +1,92 @@
+from typing import List, Optional
+
+import polars as pl
+
+from .base import Strategy
+
+COMBINE_RULES = ("and", "or", "vote", "weighted")
+
+class CompositeStrategy(Strategy):
+    """Combines the signals of several strategies into one.
+
+    - "and": long (short) only when every member is long (short)
+    - "or": long (short) when any member is long (short) and none disagrees
+    - "vote": the sign of the summed member signals
+    - "weighted": long (short) when the weighted sum is above threshold
+      (below -threshold)
+
+    Indicators of all members go into one set of columns, so members that
+    need the same indicator (e.g. "sma_50") compute it once.
+    """
+
+    def __init__(self, strategies: List[Strategy], combine: str = "vote",
+                 weights: Optional[List[float]] = None, threshold: float = 0.0):
+        super().__init__(f"Composite {combine}")
+        self.strategies = strategies
+        self.combine = combine
+        self.weights = weights
+        self.threshold = threshold
+
+    def validate(self):
+        if self.combine not in COMBINE_RULES:
+            raise ValueError(f"combine must be one of {', '.join(COMBINE_RULES)}")
+        if not self.strategies:
+            raise ValueError("A composite strategy needs at least one member")
+        if self.combine == "weighted" and (self.weights is None or len(self.weights) != len(self.strategies)):
+            raise ValueError("Weighted composites need one weight per member strategy")
+        for strategy in self.strategies:
+            strategy.validate()
+
+    def required_columns(self) -> list:
+        return list(dict.fromkeys(c for s in self.strategies for c in s.required_columns()))
+
+    def lookback(self) -> Optional[int]:
+        lookbacks = [s.lookback() for s in self.strategies]
+        return None if None in lookbacks else max(lookbacks)
+
+    def indicators(self) -> dict:
+        indicators = {}
+        for strategy in self.strategies:
+            indicators.update(strategy.indicators())
+        return indicators
+
+    def indicator_columns(self) -> dict:
+        columns = {}
+        for strategy in self.strategies:
+            columns.update(strategy.indicator_columns())
+        return columns
+
+    def signal_expr(self) -> pl.Expr:
+        signals = [s.signal_expr().cast(pl.Int8) for s in self.strategies]
+        if self.combine == "and":
+            low, high = pl.min_horizontal(signals), pl.max_horizontal(signals)
+            combined = pl.when(low == high).then(low).otherwise(0)
+        elif self.combine == "or":
+            low, high = pl.min_horizontal(signals), pl.max_horizontal(signals)
+            combined = pl.when(low >= 0).then(high).when(high <= 0).then(low).otherwise(0)
+        elif self.combine == "vote":
+            combined = pl.sum_horizontal(signals).sign()
+        else:
+            score = pl.sum_horizontal([s * w for s, w in zip(signals, self.weights)])
+            combined = (
+                pl.when(score > self.threshold).then(1)
+                .when(score < -self.threshold).then(-1)
+                .otherwise(0)
+            )
+        return combined.cast(pl.Int8)
+
+    def initial_state(self) -> dict:
+        return {"members": [s.initial_state() for s in self.strategies]}
+
+    def step(self, state: dict, close: float) -> int:
+        signals = [s.step(m, close) for s, m in zip(self.strategies, state["members"])]
+        if self.combine == "and":
+            return signals[0] if min(signals) == max(signals) else 0
+        if self.combine == "or":
+            low, high = min(signals), max(signals)
+            return high if low >= 0 else low if high <= 0 else 0
+        if self.combine == "vote":
+            total = sum(signals)
+            return (total > 0) - (total < 0)
+        score = sum(s * w for s, w in zip(signals, self.weights))
+        return 1 if score > self.threshold else -1 if score < -self.threshold else 0
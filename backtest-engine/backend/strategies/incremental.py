@@ -0,0 +1,92 @@
+"""Running indicator state for bar-by-bar strategy evaluation.
+
+States are plain dicts of floats, ints and lists so they can be copied,
+pickled or written as JSON between bars. Each push performs the same float
+operations, in the same order, as the batch expression it mirrors.
+"""
+import math
+from typing import Optional, Sequence
+
+# Rolling sums are kept in fixed point: closes rounded to multiples of
+# 1 / FIXED_POINT_SCALE and summed as integers, so the sums are exact
+FIXED_POINT_SCALE = 2 ** 30
+
+def to_fixed(value: float) -> int:
+    # The float operations of moving_average.fixed_point, rounding half up
+    return math.floor(value * FIXED_POINT_SCALE + 0.5)
+
+def rolling_state(window: int) -> dict:
+    # Window sum plus a ring buffer of the values in the window, in fixed point
+    return {"window": window, "total": 0, "values": [], "pos": 0}
+
+def rolling_mean_push(state: dict, value: float) -> Optional[float]:
+    """Add a value; returns the window mean (see moving_average.rolling_mean),
+    or None until the window is full."""
+    window, values = state["window"], state["values"]
+    fixed = to_fixed(value)
+    if len(values) < window:
+        state["total"] += fixed
+        values.append(fixed)
+        if len(values) < window:
+            return None
+    else:
+        state["total"] += fixed - values[state["pos"]]
+        values[state["pos"]] = fixed
+        state["pos"] = (state["pos"] + 1) % window
+    return float(state["total"]) * (1 / (window * FIXED_POINT_SCALE))
+
+def rolling_state_from(values: Sequence[int], total: int, count: int, window: int) -> dict:
+    """The rolling_state after pushing count values.
+
+    values are the last min(count, window) of them and total the window sum
+    after the last one, both in fixed point.
+    """
+    state = rolling_state(window)
+    if count == 0:
+        return state
+    state["total"] = total
+    if count < window:
+        state["values"] = list(values)
+        return state
+    # Slot i of the ring holds the latest bar j with j % window == i
+    state["values"] = [values[(i - (count - window)) % window] for i in range(window)]
+    state["pos"] = count % window
+    return state
+
+def ewm_state(span: int) -> dict:
+    return {"alpha": 2 / (span + 1), "mean": None, "weight": 0.0}
+
+def ewm_mean_push(state: dict, value: float) -> float:
+    """Add a value; returns the adjusted EWM mean, as pl.Expr.ewm_mean(span=...)."""
+    state["weight"] = (1 - state["alpha"]) * state["weight"] + 1
+    if state["mean"] is None:
+        state["mean"] = value
+    else:
+        state["mean"] += (value - state["mean"]) * (1 / state["weight"])
+    return state["mean"]
+
+def ewm_state_from(mean: Optional[float], count: int, span: int) -> dict:
+    """The ewm_state after pushing count values whose EWM mean is mean."""
+    state = ewm_state(span)
+    # The weight stops changing long before most series end
+    for _ in range(count):
+        weight = (1 - state["alpha"]) * state["weight"] + 1
+        if weight == state["weight"]:
+            break
+        state["weight"] = weight
+    state["mean"] = mean
+    return state
+
+def rsi_state(period: int) -> dict:
+    return {"prev_close": None, "gain": ewm_state(period), "loss": ewm_state(period)}
+
+def rsi_push(state: dict, close: float) -> float:
+    """Add a close; returns the RSI (see rsi.rsi_expr). Only reads and
+    updates the rsi_state keys, so it can run on a larger dict."""
+    delta = None if state["prev_close"] is None else close - state["prev_close"]
+    gain = delta if delta is not None and delta > 0 else 0.0
+    loss = -delta if delta is not None and delta < 0 else 0.0
+    avg_gain = ewm_mean_push(state["gain"], gain)
+    avg_loss = ewm_mean_push(state["loss"], loss)
+    state["prev_close"] = close
+    return 100 - (100 / (1 + avg_gain / max(avg_loss, 1e-10)))
@@ -1,5 +1,50 @@
 import polars as pl
-from .base import Strategy
+from .base import Indicator, Strategy
+from .incremental import FIXED_POINT_SCALE, rolling_state, rolling_mean_push, rolling_state_from
+
+# Gap below which two moving averages count as equal, relative to the long
+# average plus one fixed point step, so rounding cannot flip a position
+CROSSOVER_TOLERANCE = 1e-9
+
+def fixed_point(value: pl.Expr) -> pl.Expr:
+    """value in the fixed point of incremental.FIXED_POINT_SCALE."""
+    return (value * FIXED_POINT_SCALE + 0.5).floor().cast(pl.Int128)
+
+def rolling_mean(column: str, window: int) -> pl.Expr:
+    """Window mean from an exact sliding window sum.
+
+    Closes are rounded to multiples of 1 / FIXED_POINT_SCALE (about 1e-9)
+    and the window sum adds each bar and subtracts the one leaving as
+    integers, so it is exact however long the series: a mean is off by at
+    most that rounding. A float running sum would instead carry the
+    rounding of every earlier bar, at the scale of the highest prices seen.
+    Unlike pl.Expr.rolling_mean, every step is specified here, so
+    rolling_mean_push reproduces it bit for bit when bars arrive one at a time.
+    """
+    value = fixed_point(pl.col(column))
+    total = (value - value.shift(window).fill_null(0)).cum_sum()
+    # A multiplication, as Polars may turn division by a literal into one
+    mean = total.cast(pl.Float64) * (1 / (window * FIXED_POINT_SCALE))
+    return pl.when(pl.int_range(pl.len()) >= window - 1).then(mean)
+
+class SMA(Indicator):
+    def __init__(self, window: int):
+        self.window = window
+
+    def expr(self) -> pl.Expr:
+        return rolling_mean("close", self.window)
+
+    def initial_state(self) -> dict:
+        return rolling_state(self.window)
+
+    def push(self, state: dict, close: float):
+        return rolling_mean_push(state, close)
+
+    def build(self, close: pl.Series):
+        frame = close.rename("close").to_frame()
+        values = frame.select(self.expr()).to_series()
+        last = frame.select(fixed_point(pl.col("close"))).to_series().tail(self.window).to_list()
+        return values, rolling_state_from(last, sum(last), close.len(), self.window)
 
 class MovingAverageCrossover(Strategy):
     def __init__(self, short_window=50, long_window=200):
@@ -7,19 +52,35 @@ class MovingAverageCrossover(Strategy):
         self.short_window = short_window
         self.long_window = long_window
 
-    def generate_signals(self, data: pl.DataFrame) -> pl.DataFrame:
-        self.logger.info("Generating MA Crossover signals")
-        df = data.with_columns([
-            pl.col("close").rolling_mean(window_size=self.short_window).alias("short_ma"),
-            pl.col("close").rolling_mean(window_size=self.long_window).alias("long_ma")
-        ])
-        # Fill nulls in moving averages
-        df = df.with_columns([
-            pl.col("short_ma").fill_null(0),
-            pl.col("long_ma").fill_null(0)
-        ])
-        signals = (
-            (pl.col("short_ma") > pl.col("long_ma")).cast(pl.Int8) * 1 +
-            (pl.col("short_ma") < pl.col("long_ma")).cast(pl.Int8) * -1
-        ).fill_null(0)  # Fill any remaining nulls in signals
-        return df.with_columns([signals.alias("signals")])
\ No newline at end of file
+    def validate(self):
+        if self.short_window <= 0 or self.long_window <= 0:
+            raise ValueError("Moving average windows must be positive")
+
+    def lookback(self) -> int:
+        return max(self.short_window, self.long_window)
+
+    def indicators(self) -> dict:
+        return {f"sma_{window}": SMA(window) for window in (self.short_window, self.long_window)}
+
+    def indicator_columns(self) -> dict:
+        return {name: indicator.expr() for name, indicator in self.indicators().items()}
+
+    def signal_expr(self) -> pl.Expr:
+        short_ma = pl.col(f"sma_{self.short_window}").fill_null(0)
+        long_ma = pl.col(f"sma_{self.long_window}").fill_null(0)
+        gap = short_ma - long_ma
+        band = long_ma.abs() * CROSSOVER_TOLERANCE + 1 / FIXED_POINT_SCALE
+        return (
+            (gap > band).cast(pl.Int8) * 1 +
+            (gap < -band).cast(pl.Int8) * -1
+        ).fill_null(0)
+
+    def initial_state(self) -> dict:
+        return {"short": rolling_state(self.short_window), "long": rolling_state(self.long_window)}
+
+    def step(self, state: dict, close: float) -> int:
+        short_ma = rolling_mean_push(state["short"], close) or 0
+        long_ma = rolling_mean_push(state["long"], close) or 0
+        gap = short_ma - long_ma
+        band = abs(long_ma) * CROSSOVER_TOLERANCE + 1 / FIXED_POINT_SCALE
+        return (gap > band) - (gap < -band)
@@ -1,6 +1,46 @@
-from .base import Strategy
+from .base import Indicator, Strategy
+from .incremental import ewm_state_from, rsi_push, rsi_state
+import math
 import polars as pl
 
+def rsi_parts(period: int) -> dict:
+    """Average gain and loss (EWMs of the close-to-close moves) and the RSI."""
+    delta = pl.col("close").diff()
+    gain = pl.when(delta > 0).then(delta).otherwise(0)
+    loss = pl.when(delta < 0).then(-delta).otherwise(0)
+    avg_gain = gain.ewm_mean(span=period)
+    avg_loss = loss.ewm_mean(span=period)
+    rsi = 100 - (100 / (1 + avg_gain / avg_loss.clip(lower_bound=1e-10)))
+    return {"gain": avg_gain, "loss": avg_loss, "rsi": rsi}
+
+def rsi_expr(period: int) -> pl.Expr:
+    return rsi_parts(period)["rsi"]
+
+class RSIIndicator(Indicator):
+    def __init__(self, period: int):
+        self.period = period
+
+    def expr(self) -> pl.Expr:
+        return rsi_expr(self.period)
+
+    def initial_state(self) -> dict:
+        return rsi_state(self.period)
+
+    def push(self, state: dict, close: float) -> float:
+        return rsi_push(state, close)
+
+    def build(self, close: pl.Series):
+        parts = close.rename("close").to_frame().select(**rsi_parts(self.period))
+        state = rsi_state(self.period)
+        if close.len():
+            last = parts.row(-1, named=True)
+            state.update(
+                prev_close=float(close[-1]),
+                gain=ewm_state_from(last["gain"], close.len(), self.period),
+                loss=ewm_state_from(last["loss"], close.len(), self.period),
+            )
+        return parts.get_column("rsi"), state
+
 class RSI(Strategy):
     def __init__(self, period=14, overbought=80, oversold=20):
         super().__init__("RSI")
@@ -8,50 +48,50 @@ class RSI(Strategy):
         self.overbought = overbought
         self.oversold = oversold
 
-    def generate_signals(self, data: pl.DataFrame) -> pl.DataFrame:
-        self.logger.info("RSI Strategy")
-
+    def validate(self):
         if self.period <= 0:
             raise ValueError("Period must be positive")
         if self.oversold >= self.overbought:
             raise ValueError("Oversold threshold must be less than overbought threshold")
-        
-        df = data.with_columns([
-            pl.col("close").diff().alias("delta"),
-        ]).with_columns([
-            # gains and losses
-            pl.when(pl.col("delta") > 0).then(pl.col("delta")).otherwise(0).alias("gain"),
-            pl.when(pl.col("delta") < 0).then(-pl.col("delta")).otherwise(0).alias("loss"),
-        ]).with_columns([
-            # ewm means for gains and losses
-            pl.col("gain").ewm_mean(span=self.period).alias("avg_gain"),
-            pl.col("loss").ewm_mean(span=self.period).alias("avg_loss"),
-        ]).with_columns([
-            # relative strength (RS)
-            (pl.col("avg_gain") / pl.col("avg_loss").clip(lower_bound=1e-10)).alias("rs"),
-        ]).with_columns([
-            # RSI
-            (100 - (100 / (1 + pl.col("rs")))).alias("rsi")
-        ])
-
-        rsi = pl.col("rsi")
-        rsi_prev = rsi.shift(1)
 
+    def lookback(self) -> int:
+        # The EWMs never forget, but a bar's weight drops below float
+        # precision after this many bars; +2 for the close diff and rsi shift
+        alpha = 2 / (self.period + 1)
+        return max(math.ceil(math.log(2 ** -53) / math.log(1 - alpha)), self.period) + 2
+
+    def indicators(self) -> dict:
+        return {f"rsi_{self.period}": RSIIndicator(self.period)}
+
+    def indicator_columns(self) -> dict:
+        return {name: indicator.expr() for name, indicator in self.indicators().items()}
+
+    def signal_expr(self) -> pl.Expr:
+        rsi = pl.col(f"rsi_{self.period}")
+        rsi_prev = rsi.shift(1)
         signals = (
-            ((rsi_prev >= self.oversold) & (rsi < self.oversold)).cast(pl.Int8) * 1 +  # Crossed below -> Long
-            ((rsi_prev <= self.overbought) & (rsi > self.overbought)).cast(pl.Int8) * -1 # Crossed above -> Short
+            ((rsi_prev >= self.oversold) & (rsi < self.oversold)).cast(pl.Int8) * 1 +
+            ((rsi_prev <= self.overbought) & (rsi > self.overbought)).cast(pl.Int8) * -1
         ).fill_null(0)
-
-        # Invalidate signals for initial periods using row_number
-        df = df.with_columns([
-            pl.col("rsi").cum_count().alias("row_idx"),  # Use cum_count to get row indices (0-based)
-            signals.alias("signals")
-        ]).with_columns([
-            pl.when(pl.col("rsi").is_not_null() & (pl.col("row_idx") >= self.period))
-            .then(pl.col("signals"))
+        # No signals until the EWM has seen a full period
+        return (
+            pl.when(rsi.is_not_null() & (rsi.cum_count() >= self.period))
+            .then(signals)
             .otherwise(0)
-            .alias("signals")
-        ]).drop("row_idx")
-        
-        return df
-    
\ No newline at end of file
+        )
+
+    def initial_state(self) -> dict:
+        # rsi_push keeps the prev_close, gain and loss entries
+        return dict(rsi_state(self.period), prev_rsi=None, bars=0)
+
+    def step(self, state: dict, close: float) -> int:
+        rsi = rsi_push(state, close)
+        rsi_prev = state["prev_rsi"]
+        state["prev_rsi"] = rsi
+        state["bars"] += 1
+        if rsi_prev is None or state["bars"] < self.period:
+            return 0
+        return (
+            int(rsi_prev >= self.oversold and rsi < self.oversold) -
+            int(rsi_prev <= self.overbought and rsi > self.overbought)
+        )
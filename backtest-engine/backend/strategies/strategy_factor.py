@@ -1,27 +1,71 @@
-from typing import Dict, Any
+from typing import Callable, Dict, Any
 import logging
 from .base import Strategy
 from .moving_average import MovingAverageCrossover
 from .rsi import RSI
+from .composite import CompositeStrategy, COMBINE_RULES
 
 logger = logging.getLogger(__name__)
 
 class StrategyFactory:
-    @staticmethod
-    def create_strategy(config: Dict[str, Any]) -> Strategy:
+    """Registry of strategy builders keyed by the config "type".
+
+    Composite types ("and", "or", "vote", "weighted") take a "strategies"
+    list of member configs, built recursively, e.g.
+
+        {"type": "weighted", "weights": [0.6, 0.4], "threshold": 0.5,
+         "strategies": [{"type": "ma_crossover", "short_window": 20, "long_window": 50},
+                        {"type": "rsi", "period": 14}]}
+    """
+    _builders: Dict[str, Callable[[Dict[str, Any]], Strategy]] = {}
+
+    @classmethod
+    def register(cls, strategy_type: str):
+        """Decorator registering a builder that turns a config dict into a Strategy."""
+        def decorator(builder: Callable[[Dict[str, Any]], Strategy]):
+            cls._builders[strategy_type] = builder
+            return builder
+        return decorator
+
+    @classmethod
+    def strategy_types(cls) -> list:
+        return sorted(cls._builders)
+
+    @classmethod
+    def create_strategy(cls, config: Dict[str, Any]) -> Strategy:
         strategy_type = config.get("type")
         logger.info(f"Creating strategy: {strategy_type}")
-        
-        if strategy_type == "ma_crossover":
-            return MovingAverageCrossover(
-                short_window=config.get("short_window", 50),
-                long_window=config.get("long_window", 200)
-            )
-        elif strategy_type == "rsi":
-            return RSI(
-                period=config.get("period", 14),
-                overbought=config.get("overbought", 80),
-                oversold=config.get("oversold", 20)
-            )
-        else:
-            raise ValueError(f"Unknown strategy type: {strategy_type}")
\ No newline at end of file
+        builder = cls._builders.get(strategy_type)
+        if builder is None:
+            raise ValueError(f"Unknown strategy type: {strategy_type}")
+        return builder(config)
+
+
+@StrategyFactory.register("ma_crossover")
+def build_ma_crossover(config: Dict[str, Any]) -> Strategy:
+    return MovingAverageCrossover(
+        short_window=config.get("short_window", 50),
+        long_window=config.get("long_window", 200)
+    )
+
+@StrategyFactory.register("rsi")
+def build_rsi(config: Dict[str, Any]) -> Strategy:
+    return RSI(
+        period=config.get("period", 14),
+        overbought=config.get("overbought", 80),
+        oversold=config.get("oversold", 20)
+    )
+
+def build_composite(config: Dict[str, Any]) -> Strategy:
+    members = config.get("strategies")
+    if not isinstance(members, list):
+        raise ValueError(f"A {config['type']} strategy needs a list of member strategies")
+    return CompositeStrategy(
+        [StrategyFactory.create_strategy(member) for member in members],
+        combine=config["type"],
+        weights=config.get("weights"),
+        threshold=config.get("threshold", 0.0)
+    )
+
+for combine in COMBINE_RULES:
+    StrategyFactory.register(combine)(build_composite)
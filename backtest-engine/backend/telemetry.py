@@ -0,0 +1,115 @@
+"""Stage timings, row counts and upstream call counts, exported as Prometheus text.
+
+Work is measured into a Profile, the breakdown of one request or job:
+
+    with profiling() as profile:
+        with stage("load"):
+            data = load(...)
+        rows("input", data.height)
+    observe(profile.to_dict())
+
+stage(), rows() and count() record into the Profile active in the current
+context and are no-ops outside one. Backtests run in worker processes, so a
+worker's profile travels back with its result and is observed into this
+process's REGISTRY, which /metrics renders, by the API process.
+The metrics are prometheus_client collectors.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+REGISTRY = CollectorRegistry()
+STAGE_SECONDS = Histogram(
+    "backtest_stage_seconds", "Time spent in each stage of a backtest request or job.", ["stage"],
+    buckets=SECONDS_BUCKETS, registry=REGISTRY)
+ROWS = Histogram(
+    "backtest_rows", "Rows handled per backtest, by kind (input bars, trades).", ["kind"],
+    buckets=ROW_BUCKETS, registry=REGISTRY)
+# Counters are exported with a _total suffix
+UPSTREAM_CALLS = Counter(
+    "backtest_upstream_calls", "Calls to market data sources (database queries, cache partitions, stored indicators).",
+    ["call"], registry=REGISTRY)
+REQUEST_SECONDS = Histogram(
+    "backtest_request_seconds", "HTTP request latency.", ["method", "route", "status"],
+    buckets=SECONDS_BUCKETS, registry=REGISTRY)
+JOBS = Counter(
+    "backtest_jobs", "Backtest submissions, by whether a cached or running job was reused.", ["result"],
+    registry=REGISTRY)
+
+def render() -> bytes:
+    """REGISTRY in the Prometheus text format."""
+    return generate_latest(REGISTRY)
+
+
+class Profile:
+    """Stage durations (seconds), row counts and call counts of one request or job."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.rows: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {}
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {"started_at": self.started_at, "stages": dict(self.stages), "rows": dict(self.rows),
+                "calls": dict(self.calls)}
+
+
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("profile", default=None)
+
+@contextmanager
+def profiling(profile: Optional[Profile] = None) -> Iterator[Profile]:
+    """Make profile (a new one by default) the target of stage(), rows() and count()."""
+    profile = profile or Profile()
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+def current_profile() -> Optional[Profile]:
+    return _current.get()
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile = _current.get()
+        if profile is not None:
+            profile.add_stage(name, time.perf_counter() - start)
+
+def rows(kind: str, n: int):
+    profile = _current.get()
+    if profile is not None:
+        profile.rows[kind] = profile.rows.get(kind, 0) + n
+
+def count(call: str, n: int = 1):
+    profile = _current.get()
+    if profile is not None and n:
+        profile.calls[call] = profile.calls.get(call, 0) + n
+
+def observe(profile: Dict[str, Dict]):
+    """Add a finished profile (as from Profile.to_dict()) to the exported metrics."""
+    for name, seconds in profile.get("stages", {}).items():
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+    for kind, n in profile.get("rows", {}).items():
+        ROWS.labels(kind=kind).observe(n)
+    for call, n in profile.get("calls", {}).items():
+        UPSTREAM_CALLS.labels(call=call).inc(n)
+
+def server_timing(stages: Dict[str, float]) -> str:
+    """Stages as a Server-Timing header value (durations in milliseconds)."""
+    return ", ".join(f"{name};dur={seconds * 1e3:.3f}" for name, seconds in stages.items())
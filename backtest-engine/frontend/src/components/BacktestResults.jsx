@@ -72,7 +72,7 @@ function BacktestResults({ results }) {
           <div className="bg-blue-50 p-4 rounded-lg">
             <p className="text-sm text-gray-500">Sharpe Ratio</p>
             <p className="text-2xl font-semibold text-gray-900">
-              {results.metrics.sharpe_ratio !== undefined
+              {results.metrics.sharpe_ratio != null
                 ? results.metrics.sharpe_ratio.toFixed(2)
                 : 'N/A'}
             </p>
@@ -80,7 +80,7 @@ function BacktestResults({ results }) {
           <div className="bg-green-50 p-4 rounded-lg">
             <p className="text-sm text-gray-500">Total Return</p>
             <p className="text-2xl font-semibold text-gray-900">
-              {results.metrics.total_return !== undefined
+              {results.metrics.total_return != null
                 ? (results.metrics.total_return * 100).toFixed(2) + '%'
                 : 'N/A'}
             </p>
@@ -120,7 +120,7 @@ function BacktestResults({ results }) {
                       </span>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                      {trade.price !== undefined ? `$${trade.price.toFixed(2)}` : 'N/A'}
+                      {trade.price != null ? `$${trade.price.toFixed(2)}` : 'N/A'}
                     </td>
                   </tr>
                 ))
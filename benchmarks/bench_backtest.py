@@ -0,0 +1,214 @@
+"""Backtest engine benchmarks: strategies, fills, metrics, data loads and the API.
+
+The market data table is a temporary DuckDB file built from the synthetic
+universe, so the database benchmarks and the /backtest requests against it
+run offline. End-to-end requests go through FastAPI's in-process TestClient,
+including the worker pool and result cache.
+"""
+import io
+import itertools
+import json
+import os
+
+from generators import write_stock_db
+from harness import Suite
+
+# End-to-end latencies are noisier than the microbenchmarks
+API_THRESHOLD = 0.5
+
+suite = Suite("backtest")
+
+STRATEGIES = {
+    "ma_crossover": {"type": "ma_crossover", "short_window": 20, "long_window": 100},
+    "rsi": {"type": "rsi", "period": 14},
+    "vote": {"type": "vote", "strategies": [
+        {"type": "ma_crossover", "short_window": 20, "long_window": 100},
+        {"type": "ma_crossover", "short_window": 50, "long_window": 200},
+        {"type": "rsi", "period": 14},
+    ]},
+}
+SWEEP = {"type": "ma_crossover", "short_window": {"start": 5, "stop": 50, "step": 5},
+         "long_window": [100, 150, 200]}
+DATE_RANGE = ("1900-01-01", "2100-01-01")
+
+
+def stock_db(ctx) -> str:
+    """The synthetic universe as the market data table; BACKTEST_DB_PATH points at it.
+
+    Built once per run: the connection pool, in this process and in the API's
+    workers, opens the first database it is pointed at.
+    """
+    def build():
+        path = write_stock_db(ctx.path("stocks.duckdb"), ctx.universe())
+        os.environ["BACKTEST_DB_PATH"] = path
+        return path
+    return ctx.shared("stock_db", build)
+
+
+def signals(ctx, name):
+    from strategies.strategy_factor import StrategyFactory
+    strategy = StrategyFactory.create_strategy(STRATEGIES[name])
+    return ctx.cached(("signals", name), lambda: strategy.generate_signals(ctx.bars()))
+
+
+def _signals_benchmark(name):
+    @suite.benchmark(f"signals.{name}")
+    def setup(ctx):
+        from strategies.strategy_factor import StrategyFactory
+        strategy = StrategyFactory.create_strategy(STRATEGIES[name])
+        bars = ctx.bars()
+        return lambda: strategy.generate_signals(bars)
+
+for _name in STRATEGIES:
+    _signals_benchmark(_name)
+
+
+@suite.benchmark("signals.vote_stored")
+def stored_signals(ctx):
+    """The vote strategy with its indicators read back from the indicator store."""
+    from data_sources.indicator_store import IndicatorStore, load_indicators
+    from strategies.strategy_factor import StrategyFactory
+    strategy = StrategyFactory.create_strategy(STRATEGIES["vote"])
+    bars = ctx.bars()
+    # Not the env-configured store, which the API's workers would pick up too
+    store = IndicatorStore(ctx.path("indicators"))
+    load_indicators(bars, strategy.indicators(), "BENCH", store)
+    return lambda: strategy.generate_signals(bars, load_indicators(bars, strategy.indicators(), "BENCH", store))
+
+
+@suite.benchmark("engine.columnar_fill")
+def columnar_fill(ctx):
+    from execution.engine import columnar_fill
+    frame = signals(ctx, "ma_crossover")
+    return lambda: columnar_fill(frame, initial_capital=10_000, commission=0.001, slippage=0.0005)
+
+
+@suite.benchmark("engine.simple_market_fill", max_rows=1_000_000)
+def simple_market_fill(ctx):
+    from execution.engine import simple_market_fill
+    frame = signals(ctx, "ma_crossover")
+    return lambda: simple_market_fill(frame, initial_capital=10_000, return_trades=True)
+
+
+@suite.benchmark("metrics.compute_metrics")
+def compute_metrics(ctx):
+    from execution.engine import columnar_fill
+    from execution.metrics import compute_metrics
+    bars, _ = columnar_fill(signals(ctx, "ma_crossover"), initial_capital=10_000)
+    return lambda: compute_metrics(bars, 10_000)
+
+
+@suite.benchmark("metrics.rolling_metrics")
+def rolling_metrics(ctx):
+    from execution.engine import columnar_fill
+    from execution.metrics import rolling_metrics
+    bars, _ = columnar_fill(signals(ctx, "ma_crossover"), initial_capital=10_000)
+    return lambda: rolling_metrics(bars)
+
+
+@suite.benchmark("results.render_arrow")
+def render_arrow(ctx):
+    from execution.jobs import run_backtest
+    from execution.results import ARROW_STREAM, render
+    path = ctx.path("bars.parquet")
+    ctx.bars().write_parquet(path)
+    params = {"strategy": STRATEGIES["ma_crossover"], "initial_capital": 10_000, "commission": 0.0,
+              "slippage": 0.0, "position_size": 1.0, "mode": "long_short", "rolling_window": None}
+    result = dict(run_backtest(params, path), backtest_id="bench")
+    return lambda: render(result, ARROW_STREAM)
+
+
+@suite.benchmark("portfolio.run")
+def portfolio(ctx):
+    from data_sources.schema import normalize
+    from execution.portfolio import run_portfolio_backtest
+    from strategies.strategy_factor import StrategyFactory
+    data = normalize(ctx.universe().lazy()).collect()
+    strategy = StrategyFactory.create_strategy(STRATEGIES["ma_crossover"])
+    return lambda: run_portfolio_backtest(data, strategy, 100_000, rebalance="monthly")
+
+
+@suite.benchmark("sweep.ma_grid", max_rows=1_000_000, repeat=3)
+def sweep(ctx):
+    from execution.sweep import run_sweep
+    bars = ctx.bars()
+    # In-process, so the timing does not depend on pool start-up
+    return lambda: run_sweep(bars, SWEEP, 10_000, parallel=False)
+
+
+@suite.benchmark("data.stock_db_load")
+def stock_db_load(ctx):
+    from data_sources.stock_db import load_from_stock_db
+    stock_db(ctx)
+    symbols = ctx.universe().get_column("Symbol").unique(maintain_order=True).to_list()
+    return lambda: load_from_stock_db(symbols, *DATE_RANGE, columns=["Symbol", "date", "close"])
+
+
+@suite.benchmark("data.upload_load", max_rows=10_000_000)
+def upload_load(ctx):
+    from data_sources.custom_upload import load_from_upload
+    path = ctx.path("upload.csv")
+    ctx.universe().write_csv(path)
+    return lambda: load_from_upload(path, ["Symbol", "date", "close"])
+
+
+def client(ctx):
+    """One in-process app, and so one worker pool and result cache, per run."""
+    def build():
+        from fastapi.testclient import TestClient
+        from main import app
+        http = TestClient(app)
+        http.__enter__()
+        return http
+    return ctx.shared("client", build)
+
+
+def _backtest_params(capital, **overrides):
+    return json.dumps(dict({"strategy": STRATEGIES["ma_crossover"], "initial_capital": capital}, **overrides))
+
+
+def _post(http, form, files=None):
+    response = http.post("/backtest", data=form, files=files)
+    response.raise_for_status()
+    return response
+
+
+@suite.benchmark("api.backtest_upload", threshold=API_THRESHOLD, max_rows=1_000_000)
+def api_backtest_upload(ctx):
+    http = client(ctx)
+    body = io.BytesIO()
+    ctx.bars().write_csv(body)
+    body = body.getvalue()
+    # A new capital each call misses the result cache, so the backtest really runs
+    capital = itertools.count(10_000)
+    return lambda: _post(http, {"params": _backtest_params(next(capital))},
+                         {"file": ("bars.csv", body, "text/csv")})
+
+
+# Database requests read one symbol's history, so they need no row cap
+@suite.benchmark("api.backtest_db", threshold=API_THRESHOLD)
+def api_backtest_db(ctx):
+    stock_db(ctx)
+    http = client(ctx)
+    symbol = ctx.universe().get_column("Symbol")[0]
+    capital = itertools.count(10_000)
+    return lambda: _post(http, {"params": _backtest_params(
+        next(capital), symbol=symbol, start_date=DATE_RANGE[0], end_date=DATE_RANGE[1]
+    )})
+
+
+@suite.benchmark("api.backtest_cached", threshold=API_THRESHOLD)
+def api_backtest_cached(ctx):
+    stock_db(ctx)
+    http = client(ctx)
+    symbol = ctx.universe().get_column("Symbol")[0]
+    form = {"params": _backtest_params(10_000, symbol=symbol, start_date=DATE_RANGE[0],
+                                       end_date=DATE_RANGE[1], columnar=True)}
+    return lambda: _post(http, form)
+
+
+@suite.teardown
+def close_client(ctx):
+    http = ctx.release("client")
+    if http is not None:
+        http.__exit__(None, None, None)
@@ -0,0 +1,150 @@
+"""Valuation app benchmarks: both DCF paths, fundamentals providers and the API.
+
+Fundamentals come from generated fixtures in the ParquetStore layout served
+by FixtureProvider, in place of Yahoo Finance, so nothing touches the
+network. Endpoints are called through Flask's test client.
+"""
+import itertools
+
+import numpy as np
+
+from generators import write_fundamentals
+from harness import Suite
+
+# End-to-end latencies are noisier than the microbenchmarks
+API_THRESHOLD = 0.5
+
+suite = Suite("valuation")
+
+TICKERS = [f"FIX{i:03d}" for i in range(10)]
+DCF_PARAMS = {"growth": 0.08, "discount": 0.1, "years": 5, "terminalGrowth": 0.02}
+
+
+def fundamentals(ctx) -> str:
+    """Fixtures for TICKERS, installed as the app's provider."""
+    def build():
+        from valuation.providers import FixtureProvider, set_provider
+        root = write_fundamentals(ctx.path("fundamentals"), TICKERS, ctx.seed)
+        set_provider(FixtureProvider(root))
+        return root
+    return ctx.shared("fundamentals", build)
+
+
+def client(ctx):
+    def build():
+        fundamentals(ctx)
+        from app import app
+        return app.test_client()
+    return ctx.shared("valuation_client", build)
+
+
+def _post(http, url, payload):
+    response = http.post(url, json=payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+    return response
+
+
+@suite.benchmark("dcf.scalar", max_rows=10_000)
+def dcf_scalar(ctx):
+    """The deterministic path: one dcf_model call per valuation, ctx.rows of them."""
+    from valuation.utils import dcf_model
+    rng = np.random.default_rng(ctx.seed)
+    cases = list(zip(rng.uniform(1e8, 1e10, ctx.rows).tolist(), rng.uniform(0, 0.2, ctx.rows).tolist(),
+                     rng.uniform(0.06, 0.14, ctx.rows).tolist()))
+    return lambda: [dcf_model(fcf, growth, discount) for fcf, growth, discount in cases]
+
+
+@suite.benchmark("dcf.grid", max_rows=10_000_000)
+def dcf_grid(ctx):
+    """dcf_model broadcast over a growth x discount x terminal grid of about ctx.rows cells."""
+    from valuation.utils import dcf_model
+    side = max(2, round(ctx.rows ** (1 / 3)))
+    growth = np.linspace(0, 0.3, side)[:, None, None]
+    discount = np.linspace(0.05, 0.15, side)[None, :, None]
+    terminal = np.linspace(0, 0.04, side)[None, None, :]
+    def run():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return dcf_model(1e9, growth, discount, 5, terminal)
+    return run
+
+
+@suite.benchmark("dcf.monte_carlo")
+def dcf_monte_carlo(ctx):
+    """The Monte Carlo path: ctx.rows simulated paths through run_dcf_monte_carlo."""
+    from valuation.utils import run_dcf_monte_carlo
+    fundamentals(ctx)
+    return lambda: run_dcf_monte_carlo(TICKERS[0], ctx.rows, seed=ctx.seed)
+
+
+@suite.benchmark("dcf.estimate_control_variates")
+def dcf_estimate(ctx):
+    from valuation.monte_carlo import estimate_dcf, load_dcf_inputs
+    from valuation.routes import monte_carlo_params
+    fundamentals(ctx)
+    inputs = load_dcf_inputs(TICKERS[0])
+    # The parameters /api/dcf_monte_carlo passes for these options
+    params = dict(monte_carlo_params({"seed": ctx.seed}), control_variates=True,
+                  statistics=("mean", "percentile10", "percentile90"))
+    return lambda: estimate_dcf(inputs, ctx.rows, **params)
+
+
+@suite.benchmark("providers.fixture_fetch", max_rows=1_000)
+def fixture_fetch(ctx):
+    """Uncached reads of every dataset, the cost a cache miss adds on top of the upstream call."""
+    from valuation.providers import FixtureProvider, STATEMENTS, history_dataset
+    provider = FixtureProvider(fundamentals(ctx))
+    datasets = STATEMENTS + ("info", history_dataset("4y", "1d"))
+    return lambda: [provider.fetch(t, d) for t in TICKERS for d in datasets]
+
+
+@suite.benchmark("providers.memory_hit", max_rows=1_000)
+def memory_hit(ctx):
+    from valuation.providers import CachedProvider, FixtureProvider, STATEMENTS, history_dataset
+    provider = CachedProvider(FixtureProvider(fundamentals(ctx)))
+    datasets = STATEMENTS + ("info", history_dataset("4y", "1d"))
+    return lambda: [provider.fetch(t, d) for t in TICKERS for d in datasets]
+
+
+@suite.benchmark("api.valuation", threshold=API_THRESHOLD, max_rows=1_000)
+def api_valuation(ctx):
+    http = client(ctx)
+    tickers = itertools.cycle(TICKERS)
+    return lambda: _post(http, "/api/valuation", dict(DCF_PARAMS, ticker=next(tickers)))
+
+
+@suite.benchmark("api.key_metrics", threshold=API_THRESHOLD, max_rows=1_000)
+def api_key_metrics(ctx):
+    http = client(ctx)
+    tickers = itertools.cycle(TICKERS)
+    def run():
+        response = http.get(f"/api/key_metrics/{next(tickers)}")
+        if response.status_code != 200:
+            raise RuntimeError(response.get_data(as_text=True))
+    return run
+
+
+@suite.benchmark("api.sensitivity", threshold=API_THRESHOLD, max_rows=1_000)
+def api_sensitivity(ctx):
+    http = client(ctx)
+    payload = {"ticker": TICKERS[0], "growth": {"start": 0, "stop": 0.3, "steps": 31},
+               "discount": {"start": 0.05, "stop": 0.15, "steps": 21},
+               "terminalGrowth": [0.0, 0.01, 0.02, 0.03]}
+    return lambda: _post(http, "/api/valuation/sensitivity", payload)
+
+
+@suite.benchmark("api.dcf_monte_carlo", threshold=API_THRESHOLD, max_rows=100_000)
+def api_dcf_monte_carlo(ctx):
+    """Full response, every path value included."""
+    http = client(ctx)
+    payload = {"ticker": TICKERS[0], "iterations": ctx.rows, "seed": ctx.seed}
+    return lambda: _post(http, "/api/dcf_monte_carlo", payload)
+
+
+@suite.teardown
+def restore_provider(ctx):
+    from valuation.providers import set_provider
+    if ctx.release("fundamentals") is not None:
+        # The next get_provider() rebuilds the configured one
+        set_provider(None)
+    ctx.release("valuation_client")
@@ -0,0 +1,108 @@
+"""Deterministic synthetic data for the benchmarks.
+
+Everything is derived from a seed, so two runs of the suite (on any machine)
+see exactly the same bars, database rows and fundamentals.
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import polars as pl
+
+# Matches the market data table the backtest engine reads
+STOCK_TABLE = "nuclear_stocks.nuclear_stocks_table"
+
+# Daily bars run out of calendar quickly; longer series use minute bars
+DAILY_LIMIT = 20_000
+
+def synthetic_ohlcv(rows: int, symbols: int = 1, seed: int = 0) -> pl.DataFrame:
+    """rows bars split evenly across symbols, as Date/Open/High/Low/Close/Volume/Symbol.
+
+    Closes follow a geometric random walk per symbol. Series of up to
+    DAILY_LIMIT bars per symbol are daily (Date column of dates), longer
+    ones are minute bars (datetimes).
+    """
+    per_symbol = max(rows // symbols, 1)
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0003, 0.015, (symbols, per_symbol))
+    close = 100 * np.exp(np.cumsum(log_returns, axis=1))
+    open_ = close * (1 + rng.normal(0, 0.002, close.shape))
+    spread = np.abs(rng.normal(0, 0.004, close.shape))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(10_000, 5_000_000, close.shape)
+
+    if per_symbol <= DAILY_LIMIT:
+        start = date(1950, 1, 1)
+        dates = pl.date_range(start, start + timedelta(days=per_symbol - 1), eager=True).alias("Date")
+    else:
+        start = datetime(1990, 1, 1)
+        dates = pl.datetime_range(start, start + timedelta(minutes=per_symbol - 1), "1m",
+                                  time_unit="us", eager=True).alias("Date")
+
+    names = [f"SYM{i:04d}" for i in range(symbols)]
+    return pl.DataFrame({
+        "Date": pl.concat([dates] * symbols),
+        "Open": open_.ravel(),
+        "High": high.ravel(),
+        "Low": low.ravel(),
+        "Close": close.ravel(),
+        "Volume": volume.ravel(),
+        "Symbol": np.repeat(names, per_symbol),
+    })
+
+def write_stock_db(path: str, frame: pl.DataFrame, table: str = STOCK_TABLE) -> str:
+    """A DuckDB file holding frame in the backtest engine's market data table."""
+    import duckdb
+
+    if os.path.exists(path):
+        os.remove(path)
+    schema, name = table.split(".")
+    with duckdb.connect(path) as con:
+        con.execute(f"CREATE SCHEMA {schema}")
+        con.register("bars", frame.to_arrow())
+        con.execute(f"""
+        CREATE TABLE {schema}.{name} AS SELECT
+            CAST("Date" AS DATE) AS "Date", "Open", "High", "Low", "Close",
+            CAST("Volume" AS BIGINT) AS "Volume", "Symbol"
+        FROM bars ORDER BY "Symbol", "Date"
+        """)
+    return path
+
+def write_fundamentals(root: str, tickers, seed: int = 0) -> str:
+    """Fixtures in the valuation app's ParquetStore layout, served by FixtureProvider.
+
+    Each ticker gets four annual statements, info and four years of daily
+    closes, shaped like the Yahoo Finance datasets they stand in for.
+    """
+    import pandas as pd
+    from valuation.providers import ParquetStore, history_dataset
+
+    rng = np.random.default_rng(seed)
+    store = ParquetStore(root)
+    years = pd.to_datetime(["2024-12-31", "2023-12-31", "2022-12-31", "2021-12-31"])
+    days = pd.bdate_range("2021-01-01", "2024-12-31", tz="America/New_York")
+    for ticker in tickers:
+        scale = rng.uniform(1e9, 4e11)
+        revenue = scale / np.cumprod([1.0, *rng.uniform(1.05, 1.25, 3)])
+        margin = rng.uniform(0.08, 0.3)
+        shares = rng.uniform(1e8, 5e9)
+        store.write(ticker, "financials", pd.DataFrame(
+            [revenue, revenue * margin, np.full(4, shares)],
+            index=["Total Revenue", "Net Income", "Basic Average Shares"], columns=years
+        ))
+        store.write(ticker, "cashflow", pd.DataFrame(
+            [revenue * margin * rng.uniform(0.7, 1.1)], index=["Free Cash Flow"], columns=years
+        ))
+        store.write(ticker, "balance_sheet", pd.DataFrame(
+            [np.full(4, scale * rng.uniform(0.1, 0.5))],
+            index=["Total Non Current Liabilities Net Minority Interest"], columns=years
+        ))
+        price = 20 * np.exp(np.cumsum(rng.normal(0.0004, 0.02, len(days))))
+        store.write(ticker, "info", {
+            "marketCap": float(price[-1] * shares),
+            "sharesOutstanding": float(shares),
+            "shortName": f"{ticker} Corp",
+        })
+        store.write(ticker, history_dataset("4y", "1d"), pd.DataFrame({"Close": price}, index=days))
+    return root
@@ -0,0 +1,209 @@
+"""Timing, registration and baseline comparison for the benchmark suites.
+
+A benchmark is a setup function registered on a Suite. It receives the run
+Context and returns the zero-argument callable to time, so data generation
+and warm-up stay out of the measurement. Results are compared against a
+JSON baseline by median wall time.
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import polars as pl
+
+from generators import DAILY_LIMIT, synthetic_ohlcv
+
+# A benchmark regresses when its median exceeds the baseline by this fraction
+DEFAULT_THRESHOLD = 0.25
+
+# Fast benchmarks are looped until one sample takes at least this long, so
+# timer resolution and scheduling jitter do not dominate them
+MIN_SAMPLE_S = 0.05
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[["Context"], Callable[[], Any]]
+    threshold: Optional[float] = None
+    max_rows: Optional[int] = None
+    repeat: Optional[int] = None
+
+
+class Suite:
+    """Named collection of benchmarks, registered with the decorator."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.benchmarks: List[Benchmark] = []
+        self._teardown: List[Callable[["Context"], None]] = []
+
+    def benchmark(self, name: str, threshold: Optional[float] = None, max_rows: Optional[int] = None,
+                  repeat: Optional[int] = None):
+        """Register setup(ctx) -> fn as f"{suite}.{name}".
+
+        max_rows caps ctx.rows for benchmarks whose cost makes the largest
+        sizes impractical (row-at-a-time loops, HTTP uploads); repeat
+        overrides the run's repeat count.
+        """
+        def decorator(setup):
+            self.benchmarks.append(Benchmark(f"{self.name}.{name}", setup, threshold, max_rows, repeat))
+            return setup
+        return decorator
+
+    def teardown(self, fn: Callable[["Context"], None]):
+        """Register fn(ctx) to run after the suite, e.g. to stop servers."""
+        self._teardown.append(fn)
+        return fn
+
+
+@dataclass
+class Context:
+    """What a benchmark's setup sees: the row budget, a scratch directory
+    and the shared synthetic datasets, generated once per run."""
+    rows: int
+    workdir: str
+    seed: int = 0
+    _cache: Dict[Any, Any] = field(default_factory=dict)
+
+    def capped(self, max_rows: Optional[int]) -> "Context":
+        if max_rows is None or self.rows <= max_rows:
+            return self
+        return Context(max_rows, self.workdir, self.seed, self._cache)
+
+    @property
+    def symbols(self) -> int:
+        # Daily series like the market data table: more rows means more symbols
+        return max(1, -(-self.rows // DAILY_LIMIT))
+
+    def shared(self, key, build: Callable[[], Any]):
+        """build() once per run, whatever the row cap."""
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def release(self, key) -> Any:
+        """Forget a shared value, returning it (or None)."""
+        return self._cache.pop(key, None)
+
+    def cached(self, key, build: Callable[[], Any]):
+        """build() once per run and row count."""
+        return self.shared((key, self.rows, self.seed), build)
+
+    def bars(self) -> pl.DataFrame:
+        """One symbol, rows bars, in the engine's canonical layout."""
+        return self.cached("bars", lambda: _canonical(synthetic_ohlcv(self.rows, 1, self.seed)))
+
+    def universe(self) -> pl.DataFrame:
+        """rows bars across ctx.symbols symbols, in the raw market data layout."""
+        return self.cached("universe", lambda: synthetic_ohlcv(self.rows, self.symbols, self.seed))
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.workdir, f"{self.rows}-{name}")
+
+
+def _canonical(frame: pl.DataFrame) -> pl.DataFrame:
+    from data_sources.schema import normalize
+    return normalize(frame.lazy()).collect()
+
+
+def _sample(fn: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Seconds per call of fn: median, min and max over repeat samples.
+
+    Warm-up calls also size the samples: calls faster than MIN_SAMPLE_S are
+    repeated within a sample, like timeit's autorange.
+    """
+    number = 1
+    for _ in range(max(warmup, 1)):
+        elapsed = _sample(fn, 1)
+    if elapsed < MIN_SAMPLE_S:
+        number = int(MIN_SAMPLE_S / max(elapsed, 1e-9)) + 1
+    times = [_sample(fn, number) for _ in range(repeat)]
+    return {"median_s": statistics.median(times), "min_s": min(times), "max_s": max(times), "calls": number}
+
+
+def run_suite(suite: Suite, ctx: Context, repeat: int = 5, warmup: int = 1,
+              pattern: Optional[str] = None, report: Callable[[str, Dict[str, Any]], None] = None
+              ) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    try:
+        for bench in suite.benchmarks:
+            if pattern and pattern not in bench.name:
+                continue
+            bench_ctx = ctx.capped(bench.max_rows)
+            fn = bench.setup(bench_ctx)
+            result = measure(fn, bench.repeat or repeat, warmup)
+            result["rows"] = bench_ctx.rows
+            if bench.threshold is not None:
+                result["threshold"] = bench.threshold
+            results[bench.name] = result
+            if report:
+                report(bench.name, result)
+    finally:
+        for fn in suite._teardown:
+            fn(ctx)
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "polars": pl.__version__,
+    }
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Any]], rows: int):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    baseline = {"meta": dict(environment(), rows=rows), "results": results}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """One row per benchmark present in both, flagging regressions.
+
+    A benchmark's own threshold (set at registration) wins over threshold.
+    Benchmarks run at a different row count than the baseline are reported
+    but never flagged.
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        limit = result.get("threshold", threshold)
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        comparable = base.get("rows") == result["rows"]
+        rows.append({
+            "name": name,
+            "baseline_s": base["median_s"],
+            "median_s": result["median_s"],
+            "ratio": ratio,
+            "threshold": limit,
+            "comparable": comparable,
+            "regression": comparable and ratio > 1 + limit,
+        })
+    return rows
@@ -0,0 +1,111 @@
+"""Run the benchmark suites and check them against a saved baseline.
+
+    python benchmarks/run.py --size small --save-baseline
+    python benchmarks/run.py --size small --compare
+
+Everything runs offline on generated data (see generators.py). Baselines are
+JSON files, benchmarks/baselines/<size>.json by default; they are machine
+specific, so record one on the machine you compare on. With --compare the
+exit status is 1 when any benchmark's median is slower than its baseline by
+more than the threshold.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [
+    os.path.join(ROOT, "backtest-engine", "backend"),
+    os.path.join(ROOT, "stock-valuation-app", "backend"),
+]
+
+from harness import Context, DEFAULT_THRESHOLD, compare, load_baseline, run_suite, save_baseline
+
+# Per-call INFO logs from the strategies would drown the report (workers
+# re-import this module, so they are quietened too)
+logging.disable(logging.INFO)
+
+SIZES = {
+    "tiny": 1_000,
+    "small": 100_000,
+    "medium": 1_000_000,
+    "large": 10_000_000,
+    "xlarge": 50_000_000,
+}
+SUITES = ("backtest", "valuation")
+
+
+def load_suites(names):
+    suites = []
+    for name in names:
+        module = __import__(f"bench_{name}")
+        suites.append(module.suite)
+    return suites
+
+
+def report(name, result):
+    print(f"{name:<42} {result['rows']:>12,} rows  median {result['median_s'] * 1e3:>10.2f} ms"
+          f"  (min {result['min_s'] * 1e3:.2f}, max {result['max_s'] * 1e3:.2f})", flush=True)
+
+
+def print_comparison(rows):
+    print()
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ("rows differ" if not row["comparable"] else "ok")
+        print(f"{row['name']:<42} {row['baseline_s'] * 1e3:>10.2f} -> {row['median_s'] * 1e3:>10.2f} ms"
+              f"  x{row['ratio']:.2f} (limit x{1 + row['threshold']:.2f})  {flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--suite", choices=SUITES + ("all",), default="all")
+    parser.add_argument("--size", choices=SIZES, default="small", help="rows of market data (and paths)")
+    parser.add_argument("--rows", type=int, help="explicit row count, overrides --size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--filter", help="only benchmarks whose name contains this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="baseline file, default benchmarks/baselines/<size>.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction of the baseline median")
+    parser.add_argument("--workdir", help="keep generated data here instead of a temporary directory")
+    args = parser.parse_args(argv)
+
+    rows = args.rows or SIZES[args.size]
+    label = args.size if not args.rows else f"rows-{rows}"
+    baseline_path = args.baseline or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                  "baselines", f"{label}.json")
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # Keep the API's spooled uploads and stream output inside the scratch directory
+    os.environ.setdefault("BACKTEST_UPLOAD_DIR", workdir)
+    os.environ.setdefault("BACKTEST_STREAM_DIR", os.path.join(workdir, "streams"))
+    try:
+        ctx = Context(rows, workdir, args.seed)
+        results = {}
+        for suite in load_suites(SUITES if args.suite == "all" else (args.suite,)):
+            results.update(run_suite(suite, ctx, args.repeat, args.warmup, args.filter, report))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    status = 0
+    if args.compare:
+        rows_compared = compare(results, load_baseline(baseline_path), args.threshold)
+        print_comparison(rows_compared)
+        if any(row["regression"] for row in rows_compared):
+            status = 1
+    if args.save_baseline:
+        save_baseline(baseline_path, results, rows)
+        print(f"\nBaseline written to {baseline_path}")
+    return status
+
+
+# Spawned pool workers re-import this module; only the parent runs the suites
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,20 @@
+import os
 from flask import Flask, jsonify, request
 from valuation.routes import valuation_bp
+from valuation.telemetry import init_app as init_telemetry
 from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)
+# Request timing, opt-in profiling (?profile=1) and /metrics
+init_telemetry(app)
+
+# Async serving mode: coalesced async views shadow the matching sync routes,
+# so they must be registered first. Flask still runs each one on a worker
+# thread, in its own event loop; the gain is the coalescing.
+if os.environ.get("VALUATION_ASYNC"):
+    from valuation.async_routes import async_valuation_bp
+    app.register_blueprint(async_valuation_bp)
 
 # Register the valuation blueprint
 app.register_blueprint(valuation_bp)
@@ -0,0 +1,35 @@
+from valuation.monte_carlo import check_points, estimate_dcf
+
+INPUTS = {"revenue": 1e9, "fcf": 1e8, "margin_mean": 0.1, "shares_outstanding": 1e7}
+
+
+def test_check_points_end_at_budget():
+    points = check_points(1000, 10_000)
+    assert points[0] == 1000
+    assert points[-1] == 10_000
+    assert points == sorted(set(points))
+
+
+def test_stops_at_first_converged_check():
+    _, _, estimation = estimate_dcf(INPUTS, 10_000, statistics=["median"], tolerance=0.05, seed=1)
+    assert estimation["converged"]
+    assert estimation["paths"] == 1000
+
+
+def test_stops_below_chunk_size():
+    _, _, estimation = estimate_dcf(INPUTS, 200_000, statistics=["median"], tolerance=0.01, seed=1)
+    assert estimation["converged"]
+    assert estimation["paths"] in check_points(1000, 200_000)
+    assert estimation["paths"] < 50_000
+
+
+def test_uses_budget_when_tolerance_not_met():
+    _, _, estimation = estimate_dcf(INPUTS, 10_000, statistics=["median"], tolerance=1e-4, seed=1)
+    assert not estimation["converged"]
+    assert estimation["paths"] == 10_000
+
+
+def test_without_tolerance_runs_every_path():
+    _, _, estimation = estimate_dcf(INPUTS, 10_000, statistics=["median"], seed=1)
+    assert estimation["converged"] is None
+    assert estimation["paths"] == 10_000
@@ -0,0 +1,69 @@
+"""Async variants of the per-ticker valuation endpoints.
+
+Registered ahead of valuation_bp when VALUATION_ASYNC is set, so these views
+take precedence for the same URLs. Blocking work runs on the service pool
+and identical in-flight requests are coalesced. Flask gives every async
+view its own event loop on the request's worker thread, so a waiting
+request still occupies a worker.
+"""
+from flask import Blueprint, request, jsonify
+from .routes import compute_dcf_valuation, compute_key_metrics, estimation_params, monte_carlo_params, monte_carlo_result
+from .sampling import SAMPLING_MODES
+from .service import computation_key, run_coalesced
+
+async_valuation_bp = Blueprint('async_valuation', __name__)
+
+@async_valuation_bp.route('/api/key_metrics/<ticker>', methods=['GET'])
+async def key_metrics(ticker):
+    try:
+        result = await run_coalesced(computation_key('key_metrics', ticker), compute_key_metrics, ticker)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def ticker_error(ticker):
+    if not isinstance(ticker, str) or not ticker.strip():
+        return jsonify({"error": "ticker is required"}), 400
+    return None
+
+@async_valuation_bp.route('/api/valuation', methods=['POST'])
+async def get_dcf_valuation():
+    data = request.json or {}
+    ticker = data.get('ticker')
+    error = ticker_error(ticker)
+    if error:
+        return error
+    params = {
+        "growth": data.get('growth'),
+        "discount": data.get('discount'),
+        "years": data.get('years', 5),
+        "terminal_growth": data.get('terminalGrowth', 0.02)
+    }
+    if params["growth"] is None or params["discount"] is None:
+        return jsonify({"error": "growth and discount are required"}), 400
+    try:
+        result = await run_coalesced(computation_key('valuation', ticker, params),
+            compute_dcf_valuation, ticker, **params)
+        return jsonify(result)
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_valuation_bp.route('/api/dcf_monte_carlo', methods=['POST'])
+async def dcf_monte_carlo():
+    data = request.json or {}
+    ticker = data.get('ticker')
+    error = ticker_error(ticker)
+    if error:
+        return error
+    try:
+        iterations = int(data.get('iterations', 1000))
+        params = dict(monte_carlo_params(data), **estimation_params(data))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    if params["sampling"] not in SAMPLING_MODES:
+        return jsonify({"error": f"sampling must be one of {', '.join(SAMPLING_MODES)}"}), 400
+    key = computation_key('dcf_monte_carlo', ticker, dict(params, iterations=iterations))
+    try:
+        return jsonify(await run_coalesced(key, monte_carlo_result, ticker, iterations, params))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,41 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_BATCH_SIZE = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    # One pool shared by every batch request bounds total upstream concurrency
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = int(os.environ.get("VALUATION_BATCH_WORKERS", 16))
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="valuation-batch")
+    return _executor
+
+def is_ticker_list(tickers):
+    return (
+        isinstance(tickers, list)
+        and 0 < len(tickers) <= MAX_BATCH_SIZE
+        and all(isinstance(t, str) and t for t in tickers)
+    )
+
+def run_batch(fn, tickers):
+    """Run fn(ticker) for every ticker on the shared pool.
+
+    Returns {"results": {ticker: value}, "errors": {ticker: message}} so one
+    bad symbol does not fail the whole batch.
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    futures = {ticker: get_executor().submit(fn, ticker) for ticker in tickers}
+    results, errors = {}, {}
+    for ticker, future in futures.items():
+        try:
+            results[ticker] = future.result()
+        except Exception as e:
+            errors[ticker] = str(e)
+    return {"results": results, "errors": errors}
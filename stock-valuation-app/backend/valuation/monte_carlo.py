@@ -0,0 +1,278 @@
+from math import comb
+
+import numpy as np
+from .sampling import iter_standard_normals, norm_ppf
+from .utils import get_revenue, get_stock, get_shares_outstanding
+from .telemetry import stage, rows
+
+DEFAULT_CHUNK_SIZE = 50_000
+TERMINAL_GROWTH_RATE = 0.02
+
+def load_dcf_inputs(ticker):
+    # Fundamentals are fetched once per simulation, not once per path
+    revenue = get_revenue(ticker).iloc[0]
+    fcf = get_stock(ticker).cashflow.loc["Free Cash Flow"].iloc[0]
+    shares_outstanding = get_shares_outstanding(ticker).iloc[0]
+    return {
+        "revenue": float(revenue),
+        "fcf": float(fcf),
+        "margin_mean": float(fcf / revenue),
+        "shares_outstanding": float(shares_outstanding)
+    }
+
+def dcf_paths(revenue, growth, margin, discount_rate, years=5,
+    terminal_growth_rate=TERMINAL_GROWTH_RATE):
+    """Present value of every path in one batched evaluation.
+
+    growth, margin and discount_rate hold one entry per path, either 1-D or
+    (paths x tickers) with revenue broadcasting along the last axis. Cash
+    flows and discount factors only enter as their ratio, so this builds the
+    (paths x years) matrix of (1 + growth)^t / (1 + discount_rate)^t with one
+    cumulative product and returns the per-path present value including the
+    terminal value.
+    """
+    growth, margin, discount_rate = (np.asarray(a, dtype=float) for a in (growth, margin, discount_rate))
+    ratio = (1 + growth) / (1 + discount_rate)
+    discounted_growth = np.cumprod(np.broadcast_to(ratio[..., None], ratio.shape + (years,)), axis=-1)
+    terminal = discounted_growth[..., -1] * (1 + terminal_growth_rate) / (discount_rate - terminal_growth_rate)
+    return np.asarray(revenue, dtype=float) * margin * (discounted_growth.sum(axis=-1) + terminal)
+
+def iter_dcf_paths(inputs, iterations=1000,
+    revenue_growth_mean=0.25,
+    revenue_growth_std=0.02,
+    margin_std=0.03,
+    discount_rate_mean=0.10,
+    discount_rate_std=0.02,
+    years=5,
+    seed=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    sampling="pseudo",
+    breaks=()):
+    """Yield (per_share, draws) in chunks of at most chunk_size paths, also
+    ending a chunk at every path count in breaks.
+
+    draws is the (3, n) array of standard normal shocks to growth, margin and
+    discount rate behind each kept path. Only one chunk's matrices are alive
+    at a time, so memory stays bounded however large iterations is. Paths
+    with a non-finite value are dropped, as are all paths when the share
+    count is not positive, so a chunk may be shorter than chunk_size or empty.
+    """
+    shares_outstanding = inputs["shares_outstanding"]
+    for z in iter_standard_normals(iterations, chunk_size, 3, sampling, seed, breaks):
+        if not shares_outstanding > 0:
+            yield np.empty(0), z[:, :0]
+            continue
+        growth = revenue_growth_mean + revenue_growth_std * z[0]
+        margin = inputs["margin_mean"] + margin_std * z[1]
+        discount_rate = discount_rate_mean + discount_rate_std * z[2]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            present_value = dcf_paths(inputs["revenue"], growth, margin, discount_rate, years)
+            per_share = present_value / shares_outstanding
+        keep = np.isfinite(per_share)
+        yield per_share[keep], z[:, keep]
+
+def iter_dcf_monte_carlo(inputs, iterations=1000, **params):
+    """Yield per-share intrinsic values in chunks, see iter_dcf_paths."""
+    for values, _ in iter_dcf_paths(inputs, iterations, **params):
+        yield values
+
+def simulate_dcf(ticker, iterations=1000, seed=None, chunk_size=DEFAULT_CHUNK_SIZE, **params):
+    inputs = load_dcf_inputs(ticker)
+    with stage("monte_carlo"):
+        chunks = list(iter_dcf_monte_carlo(inputs, iterations, seed=seed, chunk_size=chunk_size, **params))
+        values = np.concatenate(chunks) if chunks else np.empty(0)
+    rows("paths", len(values))
+    return values
+
+def summarize(values):
+    if len(values) == 0:
+        return {"mean": None, "median": None, "percentile10": None, "percentile90": None}
+    p10, median, p90 = np.percentile(values, [10, 50, 90])
+    return {
+        "mean": float(np.mean(values)),
+        "median": float(median),
+        "percentile10": float(p10),
+        "percentile90": float(p90)
+    }
+
+
+QUANTILES = {"median": 0.5, "percentile10": 0.1, "percentile90": 0.9}
+STATISTICS = ("mean", *QUANTILES)
+CHECK_GROWTH = 1.2
+
+def check_points(min_paths, iterations):
+    """Path counts at which an adaptive run checks its precision: a geometric
+    schedule from min_paths, which keeps the quantile work linear overall,
+    ending with the full budget."""
+    points = []
+    point = max(int(min_paths), 1)
+    while point < iterations:
+        points.append(point)
+        point = max(int(point * CHECK_GROWTH), point + 1)
+    return points + [iterations]
+
+def normal_raw_moment(mean, std, k):
+    # E[X^k] for X ~ N(mean, std^2)
+    total, double_factorial = 0.0, 1.0
+    for j in range(0, k + 1, 2):
+        total += comb(k, j) * mean ** (k - j) * std ** j * double_factorial
+        double_factorial *= j + 1
+    return total
+
+def discount_control(inputs, draws, revenue_growth_mean, revenue_growth_std, margin_std,
+    discount_rate_mean, years):
+    """Per-share DCF of each path with the discount rate held at its mean.
+
+    Strongly correlated with the simulated value, and its expectation has a
+    closed form (see discount_control_mean), which makes it a control variate.
+    """
+    growth = revenue_growth_mean + revenue_growth_std * draws[0]
+    margin = inputs["margin_mean"] + margin_std * draws[1]
+    discount_rate = np.full(len(growth), discount_rate_mean)
+    return dcf_paths(inputs["revenue"], growth, margin, discount_rate, years) / inputs["shares_outstanding"]
+
+def discount_control_mean(inputs, revenue_growth_mean, revenue_growth_std, discount_rate_mean, years,
+    terminal_growth_rate=TERMINAL_GROWTH_RATE):
+    # Growth and margin are independent, so E[m (1+g)^t] = E[m] E[(1+g)^t]
+    growth_moments = [normal_raw_moment(1 + revenue_growth_mean, revenue_growth_std, t) for t in range(years + 1)]
+    d = 1 / (1 + discount_rate_mean)
+    npv = sum(growth_moments[t] * d ** t for t in range(1, years + 1))
+    terminal = growth_moments[years] * (1 + terminal_growth_rate) / (discount_rate_mean - terminal_growth_rate) * d ** years
+    return inputs["revenue"] * inputs["margin_mean"] * (npv + terminal) / inputs["shares_outstanding"]
+
+class MeanEstimator:
+    """Running mean with optional control variates, from sufficient statistics.
+
+    controls are zero-mean by construction; the regression coefficient is
+    re-estimated from all paths seen so far, and the error is the half-width
+    of the confidence interval on the (adjusted) mean.
+    """
+
+    def __init__(self, n_controls=0):
+        self.n = 0
+        self.shift = None
+        self.sy = 0.0
+        self.syy = 0.0
+        self.sc = np.zeros(n_controls)
+        self.scc = np.zeros((n_controls, n_controls))
+        self.scy = np.zeros(n_controls)
+
+    def add(self, y, controls=None):
+        if len(y) == 0:
+            return
+        if self.shift is None:
+            # Accumulate around the first chunk's mean to keep the sums well conditioned
+            self.shift = float(np.mean(y))
+        y = y - self.shift
+        self.n += len(y)
+        self.sy += float(y.sum())
+        self.syy += float(y @ y)
+        if controls is not None and len(self.sc):
+            self.sc += controls.sum(axis=1)
+            self.scc += controls @ controls.T
+            self.scy += controls @ y
+
+    def estimate(self, z_score):
+        if self.n < 2:
+            return None, None
+        y_bar = self.sy / self.n
+        variance = self.syy / self.n - y_bar ** 2
+        mean = y_bar
+        if len(self.sc):
+            c_bar = self.sc / self.n
+            cov_cc = self.scc / self.n - np.outer(c_bar, c_bar)
+            cov_cy = self.scy / self.n - c_bar * y_bar
+            beta = np.linalg.lstsq(cov_cc, cov_cy, rcond=None)[0]
+            mean = y_bar - beta @ c_bar
+            variance = variance - beta @ cov_cy
+        half_width = z_score * np.sqrt(max(variance, 0.0) / (self.n - 1))
+        return mean + self.shift, float(half_width)
+
+def quantile_half_width(values, q, z_score):
+    # Distribution-free interval from the order statistics around rank n*q
+    n = len(values)
+    spread = z_score * np.sqrt(n * q * (1 - q))
+    lo = int(max(np.floor(n * q - spread), 0))
+    hi = int(min(np.ceil(n * q + spread), n - 1))
+    lower, upper = np.partition(values, [lo, hi])[[lo, hi]]
+    return float(upper - lower) / 2
+
+def estimate_dcf(inputs, iterations=1000,
+    statistics=("mean",),
+    tolerance=None,
+    confidence=0.95,
+    control_variates=False,
+    min_paths=1000,
+    **params):
+    """Run the simulation and report how precise the requested statistics are.
+
+    With a tolerance, the precision is checked at min_paths and then at
+    geometrically spaced path counts (see check_points), and the run stops
+    at the first check where every statistic's confidence interval
+    half-width is within tolerance relative to its estimate, or once
+    iterations paths have been used. control_variates adjusts the mean with
+    the discount-rate-at-mean DCF plus the raw shocks as controls. Error
+    estimates treat paths as independent, which is conservative for
+    antithetic and quasi-random sampling.
+    """
+    statistics = list(statistics)
+    unknown = [stat for stat in statistics if stat not in STATISTICS]
+    if unknown or not statistics:
+        raise ValueError(f"statistics must be a non-empty list of {', '.join(STATISTICS)}")
+    z_score = float(norm_ppf(0.5 + confidence / 2))
+    mean_estimator = MeanEstimator(4 if control_variates else 0)
+    if control_variates:
+        control_params = {k: params[k] for k in
+            ("revenue_growth_mean", "revenue_growth_std", "margin_std", "discount_rate_mean", "years") if k in params}
+        control_mean = discount_control_mean(inputs, **{k: v for k, v in control_params.items() if k != "margin_std"})
+
+    # Chunks end at the check points, so a run stops as soon as it converges
+    checks = check_points(min_paths, iterations) if tolerance is not None else []
+    chunks = []
+    paths = 0
+    errors = {}
+    converged = None
+    next_check = checks[0] if checks else None
+    for values, draws in iter_dcf_paths(inputs, iterations, breaks=checks, **params):
+        chunks.append(values)
+        paths += len(values)
+        controls = None
+        if control_variates and len(values):
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                control = discount_control(inputs, draws, **control_params) - control_mean
+            controls = np.vstack([control, draws])
+        mean_estimator.add(values, controls)
+        if tolerance is None or paths < next_check:
+            continue
+        # Paths dropped as non-finite can put a check off to the next point
+        next_check = next((point for point in checks if point > paths), iterations + 1)
+        estimates, errors = precision(np.concatenate(chunks), mean_estimator, statistics, z_score)
+        converged = all(errors[stat] <= tolerance * abs(estimates[stat]) for stat in statistics)
+        if converged:
+            break
+
+    values = np.concatenate(chunks) if chunks else np.empty(0)
+    summary = summarize(values)
+    if len(values) > 1:
+        estimates, errors = precision(values, mean_estimator, statistics, z_score)
+        summary["mean"] = float(estimates["mean"])
+    return values, summary, {
+        "sampling": params.get("sampling", "pseudo"),
+        "control_variates": bool(control_variates),
+        "paths": paths,
+        "confidence": confidence,
+        "errors": errors,
+        "converged": converged if tolerance is not None else None
+    }
+
+def precision(values, mean_estimator, statistics, z_score):
+    mean, mean_error = mean_estimator.estimate(z_score)
+    estimates = {"mean": mean}
+    errors = {}
+    for stat in statistics:
+        if stat == "mean":
+            errors[stat] = mean_error
+        else:
+            estimates[stat] = float(np.quantile(values, QUANTILES[stat]))
+            errors[stat] = quantile_half_width(values, QUANTILES[stat], z_score)
+    return estimates, errors
@@ -0,0 +1,205 @@
+"""Portfolio-level Monte Carlo valuation with correlated shocks.
+
+Revenue growth and discount-rate shocks are correlated across holdings via
+Cholesky factors of a correlation matrix (given directly or built from a
+market + sector factor model). Each path values every holding with the
+same dcf_paths cash-flow logic as the single-ticker engine, in one
+(paths x tickers) evaluation. Path chunks are spread over a process pool
+and reduced to mergeable quantile sketches, so memory does not depend on
+the number of paths.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import run_batch
+from .monte_carlo import dcf_paths, load_dcf_inputs
+from .streaming import QuantileSketch
+from .utils import get_stock
+
+# Upper bound on paths x tickers x years per chunk
+CHUNK_ELEMENTS = 5_000_000
+PRICE_FIELDS = ("currentPrice", "regularMarketPrice", "previousClose")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_process_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                max_workers = int(os.environ.get("VALUATION_PROCESS_WORKERS", os.cpu_count() or 1))
+                # Forking a threaded server can copy held locks into the children
+                _pool = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def load_holding_inputs(ticker):
+    inputs = load_dcf_inputs(ticker)
+    info = get_stock(ticker).info
+    price = next((float(info[f]) for f in PRICE_FIELDS if info.get(f)), None)
+    if price is None and info.get("marketCap") and info.get("sharesOutstanding"):
+        price = info["marketCap"] / info["sharesOutstanding"]
+    inputs["price"] = price
+    return inputs
+
+def factor_correlation(tickers, sectors, market_loading=0.5, sector_loading=0.3):
+    """Correlation implied by a market factor plus one factor per sector."""
+    sector_of = np.array([sectors.get(t, t) for t in tickers])
+    same_sector = sector_of[:, None] == sector_of[None, :]
+    corr = market_loading ** 2 + same_sector * sector_loading ** 2
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+def cholesky_factor(corr):
+    corr = np.asarray(corr, dtype=float)
+    if corr.shape[0] != corr.shape[1] or not np.allclose(corr, corr.T):
+        raise ValueError("correlation matrix must be square and symmetric")
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("correlation matrix must be positive definite")
+
+def simulate_portfolio_chunk(task):
+    """Simulate one chunk of paths; runs in a worker process.
+
+    Returns (per-ticker sums, counts, sketches) and the same for the total
+    portfolio value. Paths where any holding is non-finite are left out of
+    the portfolio total.
+    """
+    (n, seed, revenue, margin_mean, shares, units,
+     growth_mean, growth_std, margin_std, discount_mean, discount_std,
+     growth_chol, discount_chol, years) = task
+    rng = np.random.default_rng(seed)
+    tickers = len(revenue)
+    growth = growth_mean + growth_std * (rng.standard_normal((n, tickers)) @ growth_chol.T)
+    margin = margin_mean + margin_std * rng.standard_normal((n, tickers))
+    discount_rate = discount_mean + discount_std * (rng.standard_normal((n, tickers)) @ discount_chol.T)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        per_share = dcf_paths(revenue, growth, margin, discount_rate, years) / shares
+        total = (per_share * units).sum(axis=1)
+
+    finite = np.isfinite(per_share)
+    sketches = []
+    for i in range(tickers):
+        sketch = QuantileSketch()
+        sketch.add(per_share[finite[:, i], i])
+        sketches.append(sketch)
+    total = total[finite.all(axis=1)]
+    total_sketch = QuantileSketch()
+    total_sketch.add(total)
+    sums = np.where(finite, per_share, 0.0).sum(axis=0)
+    return sums, finite.sum(axis=0), sketches, float(total.sum()), len(total), total_sketch
+
+def summary_from(total, count, sketch, scale=1.0):
+    p10, median, p90 = (None if q is None else q * scale for q in sketch.quantiles([0.1, 0.5, 0.9]))
+    return {
+        "mean": total / count * scale if count else None,
+        "median": median,
+        "percentile10": p10,
+        "percentile90": p90
+    }
+
+def run_portfolio_monte_carlo(holdings, iterations=10_000,
+    correlation=None,
+    discount_correlation=None,
+    factor_model=None,
+    capital=1.0,
+    revenue_growth_mean=0.25,
+    revenue_growth_std=0.02,
+    margin_std=0.03,
+    discount_rate_mean=0.10,
+    discount_rate_std=0.02,
+    years=5,
+    seed=None,
+    parallel=True):
+    """Distribution of per-holding and total intrinsic value.
+
+    holdings is a list of {"ticker", "shares"} or {"ticker", "weight"}; weights
+    are fractions of capital converted to shares at the current price. Any
+    holding may override revenue_growth_mean / revenue_growth_std. The growth
+    correlation matrix is also used for discount-rate shocks unless
+    discount_correlation is given; factor_model ({"sectors": {ticker: sector},
+    "market_loading", "sector_loading"}) builds one when no matrix is given.
+    """
+    tickers = [h["ticker"].upper() for h in holdings]
+    if len(set(tickers)) != len(tickers):
+        raise ValueError("holdings must not repeat a ticker")
+    loaded = run_batch(load_holding_inputs, tickers)
+    if loaded["errors"]:
+        raise LookupError(loaded["errors"])
+    inputs = [loaded["results"][t] for t in tickers]
+
+    units = []
+    for holding, inp in zip(holdings, inputs):
+        if "shares" in holding:
+            units.append(float(holding["shares"]))
+        elif inp["price"]:
+            units.append(float(holding["weight"]) * capital / inp["price"])
+        else:
+            raise ValueError(f"No price available to convert the weight of {holding['ticker']}")
+    units = np.array(units)
+
+    if correlation is None:
+        if factor_model is not None:
+            correlation = factor_correlation(tickers, factor_model.get("sectors", {}),
+                factor_model.get("market_loading", 0.5), factor_model.get("sector_loading", 0.3))
+        else:
+            correlation = np.eye(len(tickers))
+    growth_chol = cholesky_factor(correlation)
+    discount_chol = growth_chol if discount_correlation is None else cholesky_factor(discount_correlation)
+    if growth_chol.shape[0] != len(tickers) or discount_chol.shape[0] != len(tickers):
+        raise ValueError("correlation matrix size must match the number of holdings")
+
+    growth_mean = np.array([h.get("revenue_growth_mean", revenue_growth_mean) for h in holdings], dtype=float)
+    growth_std = np.array([h.get("revenue_growth_std", revenue_growth_std) for h in holdings], dtype=float)
+    revenue = np.array([i["revenue"] for i in inputs])
+    margin_mean = np.array([i["margin_mean"] for i in inputs])
+    shares = np.array([i["shares_outstanding"] for i in inputs])
+
+    chunk_size = max(1, CHUNK_ELEMENTS // (len(tickers) * years))
+    sizes = [min(chunk_size, iterations - start) for start in range(0, iterations, chunk_size)]
+    # One child seed per chunk keeps results independent of worker scheduling
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (n, s, revenue, margin_mean, shares, units, growth_mean, growth_std, margin_std,
+         discount_rate_mean, discount_rate_std, growth_chol, discount_chol, years)
+        for n, s in zip(sizes, seeds)
+    ]
+    if parallel and len(tasks) > 1:
+        results = get_process_pool().map(simulate_portfolio_chunk, tasks)
+    else:
+        results = map(simulate_portfolio_chunk, tasks)
+
+    sums = np.zeros(len(tickers))
+    counts = np.zeros(len(tickers), dtype=np.int64)
+    sketches = [QuantileSketch() for _ in tickers]
+    total_sum, total_count, total_sketch = 0.0, 0, QuantileSketch()
+    for chunk_sums, chunk_counts, chunk_sketches, chunk_total, chunk_count, chunk_sketch in results:
+        sums += chunk_sums
+        counts += chunk_counts
+        for sketch, other in zip(sketches, chunk_sketches):
+            sketch.merge(other)
+        total_sum += chunk_total
+        total_count += chunk_count
+        total_sketch.merge(chunk_sketch)
+
+    return {
+        "iterations": iterations,
+        "paths": total_count,
+        "holdings": {
+            ticker: {
+                "units": float(units[i]),
+                "per_share": summary_from(sums[i], counts[i], sketches[i]),
+                "position": summary_from(sums[i], counts[i], sketches[i], units[i])
+            }
+            for i, ticker in enumerate(tickers)
+        },
+        "portfolio": summary_from(total_sum, total_count, total_sketch)
+    }
@@ -0,0 +1,260 @@
+"""Fundamentals providers used by the valuation helpers.
+
+Every helper in utils.py goes through get_stock(), which returns a
+ProviderTicker bound to the configured provider. The default stack is
+
+    CachedProvider (TTL + LRU in memory)
+        -> ParquetStore (on disk, per-dataset freshness)
+        -> YFinanceProvider (network)
+
+Set VALUATION_PROVIDER=fixtures and VALUATION_FIXTURES_DIR to serve
+everything from a recorded ParquetStore directory and run fully offline.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .singleflight import SingleFlight
+from .telemetry import count, stage
+
+STATEMENTS = ("financials", "balance_sheet", "cashflow")
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# How long a dataset is considered fresh, in seconds. Annual statements only
+# change a few times a year, info carries the live market cap.
+DATASET_MAX_AGE = {
+    "financials": 7 * DAY,
+    "balance_sheet": 7 * DAY,
+    "cashflow": 7 * DAY,
+    "info": HOUR,
+    "history": 12 * HOUR,
+}
+
+def history_dataset(period, interval):
+    return f"history-{period}-{interval}"
+
+def dataset_kind(dataset):
+    return dataset.split("-", 1)[0]
+
+
+class YFinanceProvider:
+    """Fetches straight from Yahoo Finance. Every call is an upstream request."""
+
+    def fetch(self, ticker, dataset):
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+        kind = dataset_kind(dataset)
+        if kind == "history":
+            _, period, interval = dataset.split("-")
+            return stock.history(period=period, interval=interval)
+        if kind == "info":
+            return stock.info
+        if kind in STATEMENTS:
+            return getattr(stock, kind)
+        raise ValueError(f"Unknown dataset: {dataset}")
+
+
+class ParquetStore:
+    """On-disk store laid out as <root>/<TICKER>/<dataset>.parquet (info as JSON)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, ticker, dataset):
+        ext = "json" if dataset == "info" else "parquet"
+        return os.path.join(self.root, ticker.upper(), f"{dataset}.{ext}")
+
+    def read(self, ticker, dataset):
+        """Return (value, written_at) or None when nothing is stored."""
+        path = self._path(ticker, dataset)
+        try:
+            written_at = os.path.getmtime(path)
+        except OSError:
+            return None
+        if dataset == "info":
+            with open(path) as f:
+                return json.load(f), written_at
+        import pandas as pd
+        df = pd.read_parquet(path)
+        if dataset_kind(dataset) in STATEMENTS:
+            # Statements are stored transposed: parquet needs string column names
+            df = df.T
+        return df, written_at
+
+    def write(self, ticker, dataset, value):
+        path = self._path(ticker, dataset)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if dataset == "info":
+            with open(tmp, "w") as f:
+                json.dump(value, f, default=str)
+        else:
+            df = value.T if dataset_kind(dataset) in STATEMENTS else value
+            df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+
+class FixtureProvider:
+    """Serves recorded datasets from a ParquetStore directory, ignoring age."""
+
+    def __init__(self, root):
+        self.store = ParquetStore(root)
+
+    def fetch(self, ticker, dataset):
+        entry = self.store.read(ticker, dataset)
+        if entry is None:
+            raise KeyError(f"No fixture for {ticker.upper()} {dataset}")
+        return entry[0]
+
+
+class CachedProvider:
+    """Tiered cache in front of an upstream provider.
+
+    Lookups go memory -> store -> upstream. Memory is an LRU bounded by
+    maxsize; both tiers expire entries by DATASET_MAX_AGE. Concurrent misses
+    for the same (ticker, dataset) are coalesced into one load. If upstream
+    fails and a stale stored copy exists, the stale copy is served.
+    """
+
+    def __init__(self, upstream, store=None, maxsize=512, max_age=None):
+        self.upstream = upstream
+        self.store = store
+        self.maxsize = maxsize
+        self.max_age = dict(DATASET_MAX_AGE, **(max_age or {}))
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight()
+        self.stats = {"memory_hits": 0, "store_hits": 0, "upstream_calls": 0}
+
+    def _is_fresh(self, dataset, written_at):
+        return time.time() - written_at < self.max_age[dataset_kind(dataset)]
+
+    def _remember(self, key, value, written_at):
+        with self._lock:
+            self._memory[key] = (value, written_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def fetch(self, ticker, dataset):
+        key = (ticker.upper(), dataset)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._is_fresh(dataset, entry[1]):
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                count("memory_hit")
+                return entry[0]
+
+        # Concurrent misses for the same key share one store read / upstream call
+        return self._inflight.do(key, self._load, key, ticker, dataset)
+
+    def _load(self, key, ticker, dataset):
+        stale = None
+        if self.store is not None:
+            stale = self.store.read(ticker, dataset)
+            if stale is not None and self._is_fresh(dataset, stale[1]):
+                self._remember(key, *stale)
+                with self._lock:
+                    self.stats["store_hits"] += 1
+                count("store_hit")
+                return stale[0]
+
+        with self._lock:
+            self.stats["upstream_calls"] += 1
+        count("upstream")
+        try:
+            with stage("upstream"):
+                value = self.upstream.fetch(ticker, dataset)
+        except Exception:
+            if stale is None:
+                raise
+            return stale[0]
+        if self.store is not None:
+            self.store.write(ticker, dataset, value)
+        self._remember(key, value, time.time())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+
+class ProviderTicker:
+    """Drop-in for the parts of yf.Ticker the valuation helpers use."""
+
+    def __init__(self, ticker, provider):
+        self.ticker = ticker
+        self.provider = provider
+
+    def _fetch(self, dataset):
+        with stage("fetch"):
+            value = self.provider.fetch(self.ticker, dataset)
+        # Callers reindex the frames they get back, so hand out copies
+        return dict(value) if isinstance(value, dict) else value.copy()
+
+    @property
+    def info(self):
+        return self._fetch("info")
+
+    @property
+    def financials(self):
+        return self._fetch("financials")
+
+    @property
+    def balance_sheet(self):
+        return self._fetch("balance_sheet")
+
+    @property
+    def cashflow(self):
+        return self._fetch("cashflow")
+
+    def history(self, period="1mo", interval="1d"):
+        return self._fetch(history_dataset(period, interval))
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def build_provider_from_env():
+    kind = os.environ.get("VALUATION_PROVIDER", "yfinance")
+    if kind == "fixtures":
+        return FixtureProvider(os.environ.get("VALUATION_FIXTURES_DIR", "fixtures"))
+    if kind != "yfinance":
+        raise ValueError(f"Unknown VALUATION_PROVIDER: {kind}")
+    cache_dir = os.environ.get("VALUATION_CACHE_DIR", ".valuation_cache")
+    store = ParquetStore(cache_dir) if cache_dir else None
+    maxsize = int(os.environ.get("VALUATION_CACHE_SIZE", 512))
+    return CachedProvider(YFinanceProvider(), store, maxsize=maxsize)
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_provider_from_env()
+    return _provider
+
+def set_provider(provider):
+    global _provider
+    _provider = provider
+
+def record_fixtures(tickers, root, datasets=STATEMENTS + ("info", history_dataset("4y", "1d")),
+    upstream=None):
+    """Snapshot datasets for tickers into root so FixtureProvider can replay them."""
+    upstream = upstream or YFinanceProvider()
+    store = ParquetStore(root)
+    for ticker in tickers:
+        for dataset in datasets:
+            store.write(ticker, dataset, upstream.fetch(ticker, dataset))
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 3:
+        print("usage: python -m valuation.providers <fixtures_dir> <TICKER> [TICKER ...]")
+        sys.exit(1)
+    record_fixtures(sys.argv[2:], sys.argv[1])
@@ -1,8 +1,13 @@
-from flask import Blueprint, request, jsonify
-import yfinance as yf
-import pandas as pd
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import numpy as np
 from .utils import dcf_model, get_avg_pe_ratio, get_revenue, fetch_stock_data, get_net_income, get_shares_outstanding, get_ltl_fcf, get_market_cap, run_dcf_monte_carlo
+from .monte_carlo import STATISTICS, estimate_dcf, load_dcf_inputs
+from .sampling import SAMPLING_MODES
+from .streaming import DEFAULT_STREAM_CHUNK_SIZE, stream_dcf_summaries, stream_float32, to_ndjson, to_sse
+from .batch import is_ticker_list, run_batch
+from .symbols import DEFAULT_LIMIT, get_symbol_index
+from .portfolio import run_portfolio_monte_carlo
+from .telemetry import stage, rows
 
 valuation_bp = Blueprint('valuation', __name__)
 
@@ -12,7 +17,17 @@ def search_tickers():
     if not query:
         return jsonify([])
 
+    index = get_symbol_index()
+    if index is not None:
+        limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+        # "SYMBOL - shortName" format
+        return jsonify([f"{symbol} - {name}" for symbol, name in index.search(query, limit)])
+
     try:
+        # Only the fallback path needs these; importing them costs most of startup
+        import pandas as pd
+        import yfinance as yf
+
         lookup = yf.Lookup(query)
         short_names = lookup.stock.shortName  # pd.Series
 
@@ -28,9 +43,7 @@ def search_tickers():
 @valuation_bp.route('/api/stock_data/<ticker>', methods=['GET'])
 def stock_data(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        cashflow = stock.cashflow
+        info, cashflow = fetch_stock_data(ticker)
         return jsonify(info), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -38,66 +51,120 @@ def stock_data(ticker):
 @valuation_bp.route('/api/test_data/<ticker>', methods=['GET'])   
 def test_data(ticker):
     data = run_dcf_monte_carlo(ticker)
-    print(data)
-    # return jsonify(data)
+    return jsonify(data)
+
+def compute_key_metrics(ticker):
+    pe_series = get_avg_pe_ratio(ticker)
+    revenue_series = get_revenue(ticker)
+    net_income_series = get_net_income(ticker)
+    shares_outstanding_series = get_shares_outstanding(ticker)
+    ltl, fcf_series = get_ltl_fcf(ticker)
+
+    # Ensure both series are sorted from earliest to latest year
+    pe_series = pe_series.sort_index()  # index should be year
+    revenue_series = revenue_series.sort_index().dropna()
+    net_income_series = net_income_series.sort_index().dropna()
+    shares_outstanding_series = shares_outstanding_series.sort_index().dropna()
+    fcf_series = fcf_series.sort_index().dropna()
+
+    avg_pe_ratio = pe_series.mean()
+    avg_fcf = fcf_series.mean()
+    p_fcf_ratio = get_market_cap(ticker) / avg_fcf
+    revenue_growth = ((revenue_series.iloc[-1] / revenue_series.iloc[0]) - 1) * 100
+    profit_growth = ((net_income_series.iloc[-1] / net_income_series.iloc[0]) - 1) * 100
+    fcf_growth = ((fcf_series.iloc[-1] / fcf_series.iloc[0]) - 1) * 100
+
+    ltl_fcf_ratio = ltl / avg_fcf
+
+    return {
+        "pe_ratio_series": {
+            "years": list(pe_series.index.astype(str)),
+            "values": pe_series.tolist()
+        },
+        "revenue_series": {
+            "years": list(revenue_series.index.astype(str)),
+            "values": revenue_series.tolist()
+        },
+        "net_income_series": {
+            "years": list(net_income_series.index.astype(str)),
+            "values": net_income_series.tolist()
+        },
+        "shares_outstanding_series": {
+            "years": list(shares_outstanding_series.index.astype(str)),
+            "values": shares_outstanding_series.tolist()
+        },
+        "free_cash_flow_series": {
+            "years": list(fcf_series.index.astype(str)),
+            "values": fcf_series.tolist()
+        },
+        "avg_pe_ratio": round(float(avg_pe_ratio), 2),
+        "avg_p_fcf_ratio": round(float(p_fcf_ratio), 2),
+        "revenue_growth": round(float(revenue_growth), 2),
+        "profit_growth": round(float(profit_growth), 2),
+        "fcf_growth": round(float(fcf_growth), 2),
+        "ltl_fcf_ratio": round(float(ltl_fcf_ratio), 2)
+    }
+
+def compute_dcf_valuation(ticker, growth, discount, years=5, terminal_growth=0.02):
+    info, cashflow = fetch_stock_data(ticker)
+    fcf = cashflow.loc["Free Cash Flow"].iloc[0]
+    with stage("dcf"):
+        intrinsic_value = dcf_model(fcf, growth, discount, years, terminal_growth)
+    shares_outstanding = info.get("sharesOutstanding", None)
+    if not shares_outstanding:
+        raise ValueError(f"sharesOutstanding not available for {ticker}")
+    intrinsic_per_share = intrinsic_value / shares_outstanding
+    return {"intrinsicValuePerShare": round(float(intrinsic_per_share), 2)}
+
+def sensitivity_axis(spec):
+    # Either an explicit list of values or {"start", "stop", "steps"}
+    if isinstance(spec, dict):
+        return np.linspace(spec["start"], spec["stop"], int(spec.get("steps", 10)))
+    return np.atleast_1d(np.asarray(spec, dtype=float))
+
+def compute_dcf_sensitivity(ticker, growth, discount, years=5, terminal_growth=0.02):
+    info, cashflow = fetch_stock_data(ticker)
+    fcf = cashflow.loc["Free Cash Flow"].iloc[0]
+    shares_outstanding = info.get("sharesOutstanding", None)
+    if not shares_outstanding:
+        raise ValueError(f"sharesOutstanding not available for {ticker}")
+
+    growth_axis = sensitivity_axis(growth)
+    discount_axis = sensitivity_axis(discount)
+    terminal_axis = sensitivity_axis(terminal_growth)
+    # A scalar terminal growth gives a 2-D growth x discount table
+    three_d = isinstance(terminal_growth, (list, dict))
+
+    with stage("dcf"), np.errstate(divide="ignore", invalid="ignore"):
+        grid = dcf_model(
+            fcf,
+            growth_axis[:, None, None],
+            discount_axis[None, :, None],
+            years,
+            terminal_axis[None, None, :]
+        ) / shares_outstanding
+    # The Gordon growth terminal value is undefined once discount <= terminal growth
+    valid = (discount_axis[None, :, None] > terminal_axis[None, None, :]) & np.isfinite(grid)
+    grid = np.where(valid, np.round(grid, 2), np.nan)
+    rows("grid_cells", grid.size)
+    if not three_d:
+        grid = grid[:, :, 0]
+
+    return {
+        "ticker": ticker,
+        "growth": growth_axis.tolist(),
+        "discount": discount_axis.tolist(),
+        "terminalGrowth": terminal_axis.tolist() if three_d else float(terminal_axis[0]),
+        "intrinsicValuePerShare": np.where(np.isnan(grid), None, grid).tolist()
+    }
 
 @valuation_bp.route('/api/key_metrics/<ticker>', methods=['GET'])
 def key_metrics(ticker):
     try:
-        pe_series = get_avg_pe_ratio(ticker)
-        revenue_series = get_revenue(ticker)
-        net_income_series = get_net_income(ticker)
-        shares_outstanding_series = get_shares_outstanding(ticker)
-        ltl, fcf_series = get_ltl_fcf(ticker)
-
-        # Ensure both series are sorted from earliest to latest year
-        pe_series = pe_series.sort_index()  # index should be year
-        revenue_series = revenue_series.sort_index().dropna()
-        net_income_series = net_income_series.sort_index().dropna()
-        shares_outstanding_series = shares_outstanding_series.sort_index().dropna()
-        fcf_series = fcf_series.sort_index().dropna()
-
-        avg_pe_ratio = pe_series.mean()
-        avg_fcf = fcf_series.mean()
-        p_fcf_ratio = get_market_cap(ticker) / avg_fcf
-        revenue_growth = ((revenue_series.iloc[-1] / revenue_series.iloc[0]) - 1) * 100
-        profit_growth = ((net_income_series.iloc[-1] / net_income_series.iloc[0]) - 1) * 100
-        fcf_growth = ((fcf_series.iloc[-1] / fcf_series.iloc[0]) - 1) * 100
-
-        ltl_fcf_ratio = ltl / avg_fcf
-
-        return jsonify({
-            "pe_ratio_series": {
-                "years": list(pe_series.index.astype(str)),
-                "values": pe_series.tolist()
-            },
-            "revenue_series": {
-                "years": list(revenue_series.index.astype(str)),
-                "values": revenue_series.tolist()
-            },
-            "net_income_series": {
-                "years": list(net_income_series.index.astype(str)),
-                "values": net_income_series.tolist()
-            },
-            "shares_outstanding_series": {
-                "years": list(shares_outstanding_series.index.astype(str)),
-                "values": shares_outstanding_series.tolist()
-            },
-            "free_cash_flow_series": {
-                "years": list(fcf_series.index.astype(str)),
-                "values": fcf_series.tolist()
-            },
-            "avg_pe_ratio": round(avg_pe_ratio, 2),
-            "avg_p_fcf_ratio": round(p_fcf_ratio, 2),
-            "revenue_growth": round(revenue_growth, 2),
-            "profit_growth": round(profit_growth, 2),
-            "fcf_growth": round(fcf_growth, 2),
-            "ltl_fcf_ratio": round(ltl_fcf_ratio, 2)
-        }), 200
-
+        return jsonify(compute_key_metrics(ticker)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
+
 @valuation_bp.route('/api/valuation', methods=['POST'])
 def get_dcf_valuation():
     data = request.json
@@ -105,40 +172,166 @@ def get_dcf_valuation():
     growth = data.get('growth')
     discount = data.get('discount')
     years = data.get('years', 5)
-    terminalGrowth = data.get('terminalGrowth')
-    info, cashflow = fetch_stock_data(ticker)
-    # Compute FCF
+    terminalGrowth = data.get('terminalGrowth', 0.02)
+    if growth is None or discount is None:
+        return jsonify({"error": "growth and discount are required"}), 400
     try:
-        fcf = cashflow.loc["Free Cash Flow"].iloc[0]
-    except KeyError as e:
+        return jsonify(compute_dcf_valuation(ticker, growth, discount, years, terminalGrowth))
+    except (KeyError, ValueError) as e:
         return jsonify({"error": str(e)}), 500
-    intrinsic_value = dcf_model(fcf, growth, discount, years, terminalGrowth)
-    shares_outstanding = info.get("sharesOutstanding", None)
-    if shares_outstanding:
-        intrinsic_per_share = intrinsic_value / shares_outstanding
-        return jsonify({"intrinsicValuePerShare": round(intrinsic_per_share, 2)})
-    else:
+
+@valuation_bp.route('/api/valuation/sensitivity', methods=['POST'])
+def dcf_sensitivity():
+    data = request.json or {}
+    ticker = data.get('ticker')
+    growth = data.get('growth')
+    discount = data.get('discount')
+    years = data.get('years', 5)
+    terminalGrowth = data.get('terminalGrowth', 0.02)
+    if not ticker or growth is None or discount is None:
+        return jsonify({"error": "ticker, growth and discount are required"}), 400
+    try:
+        return jsonify(compute_dcf_sensitivity(ticker, growth, discount, years, terminalGrowth))
+    except (KeyError, ValueError, TypeError) as e:
         return jsonify({"error": str(e)}), 500
-    
+
+@valuation_bp.route('/api/key_metrics/batch', methods=['POST'])
+def key_metrics_batch():
+    data = request.json or {}
+    tickers = data.get('tickers')
+    if not is_ticker_list(tickers):
+        return jsonify({"error": "tickers must be a non-empty list of symbols"}), 400
+    return jsonify(run_batch(compute_key_metrics, tickers))
+
+@valuation_bp.route('/api/valuation/batch', methods=['POST'])
+def dcf_valuation_batch():
+    data = request.json or {}
+    tickers = data.get('tickers')
+    if not is_ticker_list(tickers):
+        return jsonify({"error": "tickers must be a non-empty list of symbols"}), 400
+    growth = data.get('growth')
+    discount = data.get('discount')
+    years = data.get('years', 5)
+    terminalGrowth = data.get('terminalGrowth', 0.02)
+    if growth is None or discount is None:
+        return jsonify({"error": "growth and discount are required"}), 400
+    return jsonify(run_batch(
+        lambda ticker: compute_dcf_valuation(ticker, growth, discount, years, terminalGrowth),
+        tickers
+    ))
+
+def monte_carlo_params(data):
+    return {
+        "revenue_growth_mean": data.get('revenue_growth_mean', 0.25),
+        "revenue_growth_std": data.get('revenue_growth_std', 0.02),
+        "margin_std": data.get('margin_std', 0.03),
+        "discount_rate_mean": data.get('discount_rate_mean', 0.10),
+        "discount_rate_std": data.get('discount_rate_std', 0.02),
+        "years": int(data.get('years', 5)),
+        "seed": data.get('seed'),
+        "sampling": data.get('sampling', 'pseudo')
+    }
+
+def estimation_params(data):
+    # Variance reduction and adaptive stopping options for estimate_dcf
+    statistics = data.get('statistics', ['mean'])
+    if isinstance(statistics, str):
+        statistics = [statistics]
+    if not isinstance(statistics, list) or not statistics or any(s not in STATISTICS for s in statistics):
+        raise ValueError(f"statistics must be one or more of {', '.join(STATISTICS)}")
+    return {
+        "statistics": tuple(statistics),
+        "tolerance": data.get('tolerance'),
+        "confidence": data.get('confidence', 0.95),
+        "control_variates": bool(data.get('control_variates', False))
+    }
+
+def monte_carlo_result(ticker, iterations, params):
+    inputs = load_dcf_inputs(ticker)
+    with stage("monte_carlo"):
+        values, summary, estimation = estimate_dcf(inputs, iterations, **params)
+    rows("paths", estimation["paths"])
+    return {
+        "values": values.tolist(),
+        "summary": summary,
+        "estimation": estimation
+    }
+
 @valuation_bp.route('/api/dcf_monte_carlo', methods=['POST'])
 def dcf_monte_carlo():
     data = request.json
     ticker = data.get('ticker')
-    iterations = data.get('iterations')
-    revenue_growth_mean = data.get('revenue_growth_mean')
-    revenue_growth_std = data.get('revenue_growth_std')
-    margin_std = data.get('margin_std')
-    discount_rate_mean = data.get('discount_rate_mean')
-    discount_rate_std = data.get('discount_rate_std')
-    years = data.get('years')
-    values_list = run_dcf_monte_carlo(ticker, iterations, revenue_growth_mean, revenue_growth_std, margin_std, discount_rate_mean, discount_rate_std, years)
-    summary = {
-        "mean": float(np.mean(values_list)),
-        "median": float(np.median(values_list)),
-        "percentile10": float(np.percentile(values_list, 10)),
-        "percentile90": float(np.percentile(values_list, 90))
-    }
-    return jsonify({
-        "values": values_list,
-        "summary": summary
-    })
+    iterations = int(data.get('iterations', 1000))
+    try:
+        params = dict(monte_carlo_params(data), **estimation_params(data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if params["sampling"] not in SAMPLING_MODES:
+        return jsonify({"error": f"sampling must be one of {', '.join(SAMPLING_MODES)}"}), 400
+    return jsonify(monte_carlo_result(ticker, iterations, params))
+
+@valuation_bp.route('/api/dcf_monte_carlo/stream', methods=['POST'])
+def dcf_monte_carlo_stream():
+    """Stream a Monte Carlo run instead of returning every path value.
+
+    format selects the body: "ndjson" (default) or "sse" emit progress events
+    with running summary statistics and histogram counts, "float32" streams
+    the raw per-share values as little-endian float32.
+    """
+    data = request.json or {}
+    ticker = data.get('ticker')
+    iterations = int(data.get('iterations', 1000))
+    chunk_size = int(data.get('chunk_size', DEFAULT_STREAM_CHUNK_SIZE))
+    output_format = data.get('format', 'ndjson')
+    params = monte_carlo_params(data)
+    if params["sampling"] not in SAMPLING_MODES:
+        return jsonify({"error": f"sampling must be one of {', '.join(SAMPLING_MODES)}"}), 400
+    try:
+        # Fetch up front so a bad ticker is a normal error response
+        inputs = load_dcf_inputs(ticker)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    if output_format == 'float32':
+        return Response(
+            stream_with_context(stream_float32(inputs, iterations, chunk_size=chunk_size, **params)),
+            mimetype='application/octet-stream'
+        )
+    hist_range = data.get('hist_range')
+    events = stream_dcf_summaries(inputs, iterations, bins=int(data.get('bins', 50)),
+        hist_range=hist_range, chunk_size=chunk_size, **params)
+    if output_format == 'sse':
+        return Response(stream_with_context(to_sse(events)), mimetype='text/event-stream')
+    if output_format == 'ndjson':
+        return Response(stream_with_context(to_ndjson(events)), mimetype='application/x-ndjson')
+    return jsonify({"error": f"Unknown format: {output_format}"}), 400
+
+@valuation_bp.route('/api/portfolio_monte_carlo', methods=['POST'])
+def portfolio_monte_carlo():
+    data = request.json or {}
+    holdings = data.get('holdings')
+    if not isinstance(holdings, list) or not holdings or not all(
+            isinstance(h, dict) and h.get('ticker') and ('shares' in h or 'weight' in h) for h in holdings):
+        return jsonify({"error": "holdings must be a non-empty list of {ticker, shares | weight}"}), 400
+    try:
+        # Same simulation defaults as the single-ticker endpoint, so a holding
+        # is valued alike on its own and inside a portfolio
+        params = monte_carlo_params(data)
+        del params["sampling"]
+        # Includes loading every holding's fundamentals
+        with stage("portfolio_monte_carlo"):
+            result = run_portfolio_monte_carlo(
+                holdings,
+                iterations=int(data.get('iterations', 10_000)),
+                correlation=data.get('correlation'),
+                discount_correlation=data.get('discount_correlation'),
+                factor_model=data.get('factor_model'),
+                capital=data.get('capital', 1.0),
+                **params
+            )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": "Failed to load fundamentals", "errors": e.args[0]}), 500
+    rows("paths", result["paths"])
+    return jsonify(result)
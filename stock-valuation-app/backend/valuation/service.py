@@ -0,0 +1,26 @@
+"""Coalesced, executor-backed valuation calls for the async views.
+
+Each computation is keyed by its inputs; concurrent callers with the same
+key await one shared run on a thread pool, so bursts of identical requests
+for a trending ticker cost one computation and one set of upstream fetches.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .singleflight import SingleFlight
+
+_computations = SingleFlight(ThreadPoolExecutor(
+    max_workers=int(os.environ.get("VALUATION_ASYNC_WORKERS", 32)),
+    thread_name_prefix="valuation-async"
+))
+
+def computation_key(name, ticker, params=None):
+    # JSON, so list-valued params (e.g. a growth grid) still make a hashable key
+    return (name, ticker.upper(), json.dumps(params or {}, sort_keys=True, default=str))
+
+async def run_coalesced(key, fn, *args, **kwargs):
+    return await _computations.do_async(key, fn, *args, **kwargs)
+
+def coalescing_stats():
+    return dict(_computations.stats)
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    While a call for a key is in flight, every other caller with the same
+    key gets the same result (or exception) instead of starting its own call.
+    Nothing is kept once the call finishes; caching is the caller's job.
+
+    do() runs the call inline on the first caller's thread. submit() and
+    do_async() run it on executor, so event loops are never blocked.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def _claim(self, key):
+        # Returns (future, is_leader)
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.stats["calls"] += 1
+            return future, True
+
+    def _run(self, key, future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            with self._lock:
+                self._calls.pop(key, None)
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+        else:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        future, leader = self._claim(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result()
+
+    def submit(self, key, fn, *args, **kwargs):
+        future, leader = self._claim(key)
+        if leader:
+            self.executor.submit(self._run, key, future, fn, args, kwargs)
+        return future
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        # Shielded so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(asyncio.wrap_future(self.submit(key, fn, *args, **kwargs)))
@@ -0,0 +1,191 @@
+"""Bounded-memory summaries for streamed Monte Carlo runs.
+
+Nothing here keeps the simulated values around: the running mean is a
+sum/count pair, quantiles come from a log-binned relative-error sketch
+(DDSketch style) and the histogram has a fixed set of bins, so memory does
+not grow with the number of paths.
+"""
+import json
+
+import numpy as np
+
+from .monte_carlo import iter_dcf_monte_carlo
+
+# Smaller than the batch default so clients see updates early
+DEFAULT_STREAM_CHUNK_SIZE = 10_000
+
+class QuantileSketch:
+    """Quantile sketch with relative_accuracy error on every estimate.
+
+    Magnitudes are bucketed on a log scale between min_value and max_value;
+    anything smaller counts as zero and anything larger lands in the last
+    bucket. The bucket arrays are allocated once, up front.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-4, max_value=1e12):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.offset = int(np.ceil(np.log(min_value) / self.log_gamma))
+        size = int(np.ceil(np.log(max_value) / self.log_gamma)) - self.offset + 1
+        self.positive = np.zeros(size, dtype=np.int64)
+        self.negative = np.zeros(size, dtype=np.int64)
+        self.zero = 0
+        self.count = 0
+        # Midpoint of each bucket, relative error bounded by relative_accuracy
+        self.bucket_values = 2 * self.gamma ** (np.arange(size) + self.offset) / (self.gamma + 1)
+
+    def _bucket_counts(self, magnitudes):
+        idx = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64) - self.offset
+        idx = np.clip(idx, 0, len(self.positive) - 1)
+        return np.bincount(idx, minlength=len(self.positive))
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        positive = values[values >= self.min_value]
+        negative = -values[values <= -self.min_value]
+        self.positive += self._bucket_counts(positive)
+        self.negative += self._bucket_counts(negative)
+        self.zero += len(values) - len(positive) - len(negative)
+        self.count += len(values)
+
+    def __getstate__(self):
+        # Ship only the occupied bucket range, e.g. back from worker processes
+        state = dict(self.__dict__)
+        del state["bucket_values"]
+        for name in ("positive", "negative"):
+            counts = state[name]
+            occupied = np.flatnonzero(counts)
+            lo, hi = (occupied[0], occupied[-1] + 1) if len(occupied) else (0, 0)
+            state[name] = (len(counts), lo, counts[lo:hi])
+        return state
+
+    def __setstate__(self, state):
+        for name in ("positive", "negative"):
+            size, lo, occupied = state[name]
+            counts = np.zeros(size, dtype=np.int64)
+            counts[lo:lo + len(occupied)] = occupied
+            state[name] = counts
+        self.__dict__.update(state)
+        self.bucket_values = 2 * self.gamma ** (np.arange(len(self.positive)) + self.offset) / (self.gamma + 1)
+
+    def merge(self, other):
+        # Sketches with the same parameters combine by adding bucket counts
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantiles(self, qs):
+        if self.count == 0:
+            return [None] * len(qs)
+        counts = np.concatenate([self.negative[::-1], [self.zero], self.positive])
+        values = np.concatenate([-self.bucket_values[::-1], [0.0], self.bucket_values])
+        cumulative = np.cumsum(counts)
+        ranks = np.asarray(qs) * (self.count - 1)
+        return values[np.searchsorted(cumulative, ranks, side="right")].tolist()
+
+
+class FixedHistogram:
+    """Histogram over fixed edges with explicit underflow/overflow counts."""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def from_sample(cls, sample, bins=50):
+        # Fix the range from the first chunk, trimmed so a few extreme
+        # paths do not squash every other bin
+        low, high = np.percentile(sample, [0.5, 99.5]) if len(sample) else (0.0, 1.0)
+        if high <= low:
+            high = low + 1.0
+        return cls(np.linspace(low, high, bins + 1))
+
+    def add(self, values):
+        self.counts += np.histogram(values, self.edges)[0]
+        self.underflow += int(np.count_nonzero(values < self.edges[0]))
+        self.overflow += int(np.count_nonzero(values > self.edges[-1]))
+
+    def to_dict(self, include_edges=False):
+        result = {
+            "counts": self.counts.tolist(),
+            "underflow": self.underflow,
+            "overflow": self.overflow
+        }
+        if include_edges:
+            result["edges"] = self.edges.tolist()
+        return result
+
+
+class StreamingSummary:
+    def __init__(self, relative_accuracy=0.01):
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.histogram = None
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, values, bins=50, hist_range=None):
+        if self.histogram is None:
+            self.histogram = (
+                FixedHistogram(np.linspace(hist_range[0], hist_range[1], bins + 1))
+                if hist_range else FixedHistogram.from_sample(values, bins)
+            )
+        self.sketch.add(values)
+        self.histogram.add(values)
+        self.total += float(np.sum(values))
+        self.count += len(values)
+
+    def summary(self):
+        p10, median, p90 = self.sketch.quantiles([0.1, 0.5, 0.9])
+        return {
+            "mean": self.total / self.count if self.count else None,
+            "median": median,
+            "percentile10": p10,
+            "percentile90": p90
+        }
+
+
+def stream_dcf_summaries(inputs, iterations, bins=50, hist_range=None,
+    chunk_size=DEFAULT_STREAM_CHUNK_SIZE, **params):
+    """Yield one progress event per simulated chunk, then a final event.
+
+    Histogram edges are sent with the first progress event and the final
+    event; events in between only carry the counts.
+    """
+    summary = StreamingSummary()
+    simulated = 0
+    for chunk in iter_dcf_monte_carlo(inputs, iterations, chunk_size=chunk_size, **params):
+        first = simulated == 0
+        simulated = min(iterations, simulated + chunk_size)
+        summary.add(chunk, bins, hist_range)
+        yield {
+            "type": "progress",
+            "iterations": iterations,
+            "simulated": simulated,
+            "paths": summary.count,
+            "summary": summary.summary(),
+            "histogram": summary.histogram.to_dict(include_edges=first)
+        }
+    yield {
+        "type": "done",
+        "iterations": iterations,
+        "paths": summary.count,
+        "summary": summary.summary(),
+        "histogram": summary.histogram.to_dict(include_edges=True) if summary.histogram else None
+    }
+
+def to_ndjson(events):
+    for event in events:
+        yield json.dumps(event) + "\n"
+
+def to_sse(events):
+    for event in events:
+        yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def stream_float32(inputs, iterations, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, **params):
+    """Raw little-endian float32 per-share values, one chunk at a time."""
+    for chunk in iter_dcf_monte_carlo(inputs, iterations, chunk_size=chunk_size, **params):
+        yield chunk.astype("<f4").tobytes()
@@ -0,0 +1,209 @@
+"""In-process ticker symbol index backing /api/tickers.
+
+The index is built from a local CSV or Parquet file with a symbol column
+and a name column, and is swapped atomically when a background thread
+sees the file change. Lookups never leave the process.
+
+Matches are ranked: exact symbol, symbol prefix, name token prefix (every
+query word must prefix some word of the name, names starting with the query
+first), then fuzzy matches within about one edit of a symbol or name word.
+"""
+import csv
+import logging
+import os
+import re
+import threading
+import time
+
+DEFAULT_LIMIT = 25
+# Each trie node keeps its best entries so a lookup never walks the subtree
+NODE_CAPACITY = 50
+MIN_FUZZY_LENGTH = 3
+
+SYMBOL_COLUMNS = ("symbol", "Symbol", "ticker", "Ticker")
+NAME_COLUMNS = ("shortName", "name", "Name", "longName")
+
+logger = logging.getLogger(__name__)
+
+_token_re = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return _token_re.findall(text.lower())
+
+def deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class PrefixTrie:
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, word, entry_id):
+        node = self.root
+        for ch in word:
+            node = node.setdefault(ch, {})
+            ids = node.setdefault(None, [])
+            if len(ids) < NODE_CAPACITY:
+                ids.append(entry_id)
+
+    def search(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get(None, [])
+
+
+class SymbolIndex:
+    def __init__(self, entries):
+        # Shorter symbols first so every trie node keeps its closest matches
+        self.entries = sorted(
+            {symbol.upper(): name for symbol, name in entries if symbol}.items(),
+            key=lambda e: (len(e[0]), e[0])
+        )
+        self.by_symbol = {}
+        self.symbol_trie = PrefixTrie()
+        self.token_trie = PrefixTrie()
+        self.name_tokens = []
+        self.fuzzy = {}
+        for entry_id, (symbol, name) in enumerate(self.entries):
+            self.by_symbol[symbol] = entry_id
+            self.symbol_trie.insert(symbol, entry_id)
+            tokens = tokenize(name or "")
+            self.name_tokens.append(tokens)
+            for word in set(tokens):
+                self.token_trie.insert(word, entry_id)
+            for word in {symbol.lower(), *tokens}:
+                if len(word) >= MIN_FUZZY_LENGTH:
+                    for variant in deletes(word) | {word}:
+                        self.fuzzy.setdefault(variant, []).append(entry_id)
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith(".parquet"):
+            import pandas as pd
+            df = pd.read_parquet(path)
+            rows = df.to_dict("records")
+        else:
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+        if not rows:
+            return cls([])
+        symbol_col = next((c for c in SYMBOL_COLUMNS if c in rows[0]), None)
+        if symbol_col is None:
+            raise ValueError(f"{path} has no symbol column; expected one of {', '.join(SYMBOL_COLUMNS)}")
+        name_col = next((c for c in NAME_COLUMNS if c in rows[0]), None)
+        return cls(
+            (str(row[symbol_col]).strip(), str(row[name_col] or "").strip() if name_col else "")
+            for row in rows
+        )
+
+    def _fuzzy_ids(self, word):
+        ids = []
+        for variant in deletes(word) | {word}:
+            ids.extend(self.fuzzy.get(variant, ()))
+        return ids
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        query = query.strip()
+        words = tokenize(query)
+        if not words:
+            return []
+        ranked = []
+        symbol = query.upper()
+        if symbol in self.by_symbol:
+            ranked.append(self.by_symbol[symbol])
+        ranked.extend(self.symbol_trie.search(symbol))
+        if len(ranked) < limit:
+            first, rest = words[0], words[1:]
+            matches = [
+                entry_id for entry_id in self.token_trie.search(first)
+                if all(any(t.startswith(w) for t in self.name_tokens[entry_id]) for w in rest)
+            ]
+            # Names that start with the query beat names that merely contain it
+            matches.sort(key=lambda entry_id: (
+                not self.name_tokens[entry_id][0].startswith(first),
+                first not in self.name_tokens[entry_id]
+            ))
+            ranked.extend(matches)
+        if len(ranked) < limit and len(words[0]) >= MIN_FUZZY_LENGTH:
+            ranked.extend(self._fuzzy_ids(words[0]))
+
+        results = []
+        seen = set()
+        for entry_id in ranked:
+            if entry_id not in seen:
+                seen.add(entry_id)
+                results.append(self.entries[entry_id])
+                if len(results) == limit:
+                    break
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+_refresher = None
+# When a lookup last found no usable symbol file
+_missed_at = None
+
+def symbols_file():
+    return os.environ.get("VALUATION_SYMBOLS_FILE", "symbols.csv")
+
+def refresh_interval():
+    return float(os.environ.get("VALUATION_SYMBOLS_REFRESH", 300))
+
+def load_index(path=None):
+    global _index
+    path = path or symbols_file()
+    index = SymbolIndex.from_file(path)
+    _index = index
+    return index
+
+def get_symbol_index():
+    """Return the loaded index, or None when no usable symbol file is available.
+
+    A missing or malformed file is looked for again after the refresh
+    interval, not on every lookup.
+    """
+    global _missed_at
+    if _index is None:
+        if _missed_at is not None and time.monotonic() - _missed_at < refresh_interval():
+            return None
+        with _index_lock:
+            if _index is None:
+                path = symbols_file()
+                try:
+                    if os.path.exists(path):
+                        load_index(path)
+                        start_refresh(path)
+                    else:
+                        _missed_at = time.monotonic()
+                except (OSError, ValueError, csv.Error) as e:
+                    logger.warning("Ignoring symbol file %s: %s", path, e)
+                    _missed_at = time.monotonic()
+    return _index
+
+def start_refresh(path=None, interval=None):
+    """Reload the index in a daemon thread whenever the symbol file changes."""
+    global _refresher
+    if _refresher is not None:
+        return
+    path = path or symbols_file()
+    interval = interval or refresh_interval()
+
+    def refresh():
+        last_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        while True:
+            time.sleep(interval)
+            try:
+                mtime = os.path.getmtime(path)
+                if mtime != last_mtime:
+                    load_index(path)
+                    last_mtime = mtime
+            except Exception:
+                # Keep serving the previous index until the file is readable again
+                pass
+
+    _refresher = threading.Thread(target=refresh, name="symbol-index-refresh", daemon=True)
+    _refresher.start()
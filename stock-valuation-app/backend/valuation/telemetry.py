@@ -0,0 +1,120 @@
+"""Stage timings, row counts and upstream call counts, exported as Prometheus text.
+
+Code marks its stages with stage(), rows() and count(). Each records
+straight into the process-wide REGISTRY, rendered by /metrics, and also into
+the current request's profile when the request opted in with ?profile=1 or
+"profile": true in its JSON body. A profiled response carries the breakdown
+as a "profile" entry (JSON object bodies) and a Server-Timing header.
+
+Work handed to other threads (batch endpoints, async mode) still reaches the
+metrics, but not the per-request profile.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PATH_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+REGISTRY = CollectorRegistry()
+STAGE_SECONDS = Histogram(
+    "valuation_stage_seconds", "Time spent in each stage (fetch, upstream, dcf, monte_carlo, ...).",
+    ["stage"], buckets=SECONDS_BUCKETS, registry=REGISTRY)
+ROWS = Histogram(
+    "valuation_rows", "Items computed per call, by kind (Monte Carlo paths, grid cells).",
+    ["kind"], buckets=PATH_BUCKETS, registry=REGISTRY)
+# Exported as valuation_provider_calls_total
+CALLS = Counter(
+    "valuation_provider_calls", "Fundamentals lookups by outcome (memory_hit, store_hit, upstream).",
+    ["call"], registry=REGISTRY)
+REQUEST_SECONDS = Histogram(
+    "valuation_request_seconds", "HTTP request latency.", ["method", "route", "status"],
+    buckets=SECONDS_BUCKETS, registry=REGISTRY)
+
+
+class Profile:
+    """Stage durations (seconds), row counts and call counts of one request."""
+
+    def __init__(self):
+        self.stages = {}
+        self.rows = {}
+        self.calls = {}
+
+    def to_dict(self):
+        return {"stages": dict(self.stages), "rows": dict(self.rows), "calls": dict(self.calls)}
+
+
+_current = contextvars.ContextVar("profile", default=None)
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        profile = _current.get()
+        if profile is not None:
+            profile.stages[name] = profile.stages.get(name, 0.0) + elapsed
+
+def rows(kind, n):
+    ROWS.labels(kind=kind).observe(n)
+    profile = _current.get()
+    if profile is not None:
+        profile.rows[kind] = profile.rows.get(kind, 0) + n
+
+def count(call, n=1):
+    CALLS.labels(call=call).inc(n)
+    profile = _current.get()
+    if profile is not None:
+        profile.calls[call] = profile.calls.get(call, 0) + n
+
+
+def _profile_requested():
+    if request.args.get("profile", "").lower() in ("1", "true", "yes"):
+        return True
+    body = request.get_json(silent=True) if request.is_json else None
+    return isinstance(body, dict) and body.get("profile") is True
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    if _profile_requested():
+        g.profile_token = _current.set(Profile())
+
+def _after_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.labels(method=request.method, route=route, status=response.status_code).observe(
+        time.perf_counter() - g.request_started)
+    profile = _current.get()
+    if profile is None:
+        return response
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={seconds * 1e3:.3f}" for name, seconds in profile.stages.items())
+    # Streamed bodies are still being produced; they get the header only
+    if response.is_json and not response.is_streamed:
+        body = response.get_json()
+        if isinstance(body, dict):
+            body["profile"] = profile.to_dict()
+            response.set_data(current_app.json.dumps(body))
+    return response
+
+def _teardown_request(exc):
+    token = g.pop("profile_token", None)
+    if token is not None:
+        _current.reset(token)
+
+def metrics():
+    return Response(generate_latest(REGISTRY), content_type=CONTENT_TYPE)
+
+def init_app(app):
+    """Time every request, honour profiling opt-ins and serve /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
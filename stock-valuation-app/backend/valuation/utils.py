@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 
 def fetch_stock_data(ticker):
@@ -8,14 +7,25 @@ def fetch_stock_data(ticker):
     return info, cashflow
 
 def dcf_model(fcf, growth, discount, years=5, terminal_growth=0.02):
+    """Present value of fcf grown at growth and discounted at discount.
+
+    growth, discount and terminal_growth may be NumPy arrays, in which case
+    they broadcast against each other and an array of values is returned,
+    e.g. growth[:, None, None], discount[None, :, None] and
+    terminal_growth[None, None, :] evaluate a full 3-D sensitivity grid.
+    """
+    growth = np.asarray(growth, dtype=float)
+    discount = np.asarray(discount, dtype=float)
+    terminal_growth = np.asarray(terminal_growth, dtype=float)
     fcf = fcf * (1 + growth)
     npv = 0
     for t in range(1, years + 1):
-        npv += fcf / ((1 + discount) ** t)
-        fcf *= (1 + growth)
+        npv = npv + fcf / ((1 + discount) ** t)
+        fcf = fcf * (1 + growth)
     terminal_value = fcf * (1 + terminal_growth) / (discount - terminal_growth)
     terminal_pv = terminal_value / ((1 + discount) ** years)
-    return npv + terminal_pv
+    value = npv + terminal_pv
+    return float(value) if np.ndim(value) == 0 else value
 
 def get_avg_pe_ratio(ticker):
     stock = get_stock(ticker)
@@ -23,6 +33,7 @@ def get_avg_pe_ratio(ticker):
     net_income = financials.loc["Net Income"]
     shares_outstanding = financials.loc["Basic Average Shares"]
     eps = net_income / shares_outstanding
+    import pandas as pd
     price_data = stock.history(period="4y", interval="1d")
     price_data = price_data.resample("YE").last()
     eps.index = eps.index.year
@@ -61,8 +72,7 @@ def get_ltl_fcf(ticker):
     return ltl.iloc[0], fcf
 
 def get_market_cap(ticker):
-    import yfinance as yf
-    stock = yf.Ticker(ticker)
+    stock = get_stock(ticker)
     return stock.info["marketCap"]
 
 def run_dcf_monte_carlo(ticker, iterations=1000,
@@ -71,39 +81,17 @@ def run_dcf_monte_carlo(ticker, iterations=1000,
     margin_std=0.03,
     discount_rate_mean=0.10,
     discount_rate_std=0.02,
-    years=5):
-    intrinsic_values = []
-    stock = get_stock(ticker)
-
-    for _ in range(iterations):
-        revenue = get_revenue(ticker).iloc[0]
-        fcf = stock.cashflow.loc["Free Cash Flow"].iloc[0]
-        margin_mean = fcf / revenue
-        shares_outstanding = get_shares_outstanding(ticker).iloc[0]
-
-        growth = np.random.normal(revenue_growth_mean, revenue_growth_std)
-        margin = np.random.normal(margin_mean, margin_std)
-        discount_rate = np.random.normal(discount_rate_mean, discount_rate_std)
-
-        cash_flows = []
-
-        for _ in range(years):
-            revenue *= (1 + growth)
-            cash_flow = revenue * margin
-            cash_flows.append(cash_flow)
-
-        terminal_growth_rate = 0.02  # 2% terminal growth rate, adjust as needed
-        # Calculate terminal value based on last year's cash flow
-        terminal_value = cash_flows[-1] * (1 + terminal_growth_rate) / (discount_rate - terminal_growth_rate)
-        # Discount terminal value back to present
-        terminal_value_pv = terminal_value / (1 + discount_rate)**years
-        # Total present value = sum of discounted cash flows + discounted terminal value
-        present_value = sum(cf / (1 + discount_rate)**(i+1) for i, cf in enumerate(cash_flows)) + terminal_value_pv
-        if isinstance(present_value, float) and not np.isnan(present_value) and shares_outstanding > 0:
-            intrinsic_per_share = present_value / shares_outstanding
-            intrinsic_values.append(intrinsic_per_share)
-
-    return intrinsic_values
+    years=5,
+    seed=None):
+    from .monte_carlo import simulate_dcf
+    values = simulate_dcf(ticker, iterations, seed=seed,
+        revenue_growth_mean=revenue_growth_mean,
+        revenue_growth_std=revenue_growth_std,
+        margin_std=margin_std,
+        discount_rate_mean=discount_rate_mean,
+        discount_rate_std=discount_rate_std,
+        years=years)
+    return values.tolist()
 
 
 def get_stock_financials(ticker):
@@ -111,5 +99,5 @@ def get_stock_financials(ticker):
     return stock.financials
 
 def get_stock(ticker):
-    import yfinance as yf
-    return yf.Ticker(ticker)
\ No newline at end of file
+    from .providers import ProviderTicker, get_provider
+    return ProviderTicker(ticker, get_provider())
\ No newline at end of file